@@ -1,11 +1,43 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import json
+import logging
+
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.const import CONF_ENTITY_ID, CONF_SEQUENCE
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
 from homeassistant.helpers.discovery import async_load_platform
 from homeassistant.config_entries import ConfigEntry
 
-from .const import DOMAIN, CONF_ZONES
+from . import websocket
+
+from .const import (
+    DOMAIN,
+    CONF_ZONES,
+    CONF_SIMULATOR,
+    CONF_ROOM_ID,
+    CONF_CLEAN_TIMES,
+    CONF_FAN_LEVEL,
+    CONF_WATER_LEVEL,
+    CONF_CLEAN_MODE,
+    CONF_MOP_MODE,
+    CONF_ON,
+    CONF_AREA_ID,
+    CONF_ROUTE,
+    CONF_WAIT_SEQUENCE,
+    CONF_OPTIMIZE_ROUTE,
+    SERVICE_CLEAN_AREA,
+    SERVICE_CLEAN_NOW,
+    SERVICE_START_TRACE,
+    SERVICE_STOP_TRACE,
+    CONF_FILENAME,
+    STARTUP_BUDGET,
+)
+
+_LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -20,11 +52,15 @@ CONFIG_SCHEMA = vol.Schema(
                             vol.Optional("zone"): list,
                             vol.Optional("repeats"): int,
                             vol.Optional("goto"): list,
+                            vol.Optional(CONF_ROUTE): vol.All(list, vol.Length(min=1)),
+                            vol.Optional(CONF_OPTIMIZE_ROUTE): bool,
                             vol.Optional(CONF_SEQUENCE): cv.SCRIPT_SCHEMA,
+                            vol.Optional(CONF_WAIT_SEQUENCE): bool,
                         },
                         extra=vol.ALLOW_EXTRA,
                     )
                 },
+                vol.Optional(CONF_SIMULATOR): dict,
             }
         )
     },
@@ -32,8 +68,55 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 
+CLEAN_AREA_SCHEMA = vol.Schema({vol.Required(CONF_AREA_ID): cv.ensure_list})
+CLEAN_NOW_SCHEMA = vol.Schema({vol.Required(CONF_ENTITY_ID): cv.entity_ids})
+START_TRACE_SCHEMA = vol.Schema(
+    {vol.Required(CONF_ENTITY_ID): cv.entity_id, vol.Optional(CONF_FILENAME): cv.string}
+)
+STOP_TRACE_SCHEMA = vol.Schema({vol.Required(CONF_ENTITY_ID): cv.entity_id})
+
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the Vacuum Zones component."""
+
+    async def async_clean_area(call: ServiceCall) -> None:
+        from .vacuum import async_clean_areas
+
+        await async_clean_areas(hass, call.data[CONF_AREA_ID], call.context)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLEAN_AREA, async_clean_area, schema=CLEAN_AREA_SCHEMA
+    )
+
+    async def async_clean_now(call: ServiceCall) -> None:
+        from .vacuum import async_clean_now
+
+        await async_clean_now(hass, call.data[CONF_ENTITY_ID], call.context)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLEAN_NOW, async_clean_now, schema=CLEAN_NOW_SCHEMA
+    )
+
+    # Трассы нужны только для отладки планировщика - модуль грузим при первом вызове
+    async def async_start_trace(call: ServiceCall) -> None:
+        from .trace import async_start_trace
+
+        await async_start_trace(hass, call.data[CONF_ENTITY_ID], call.data.get(CONF_FILENAME))
+
+    async def async_stop_trace(call: ServiceCall) -> None:
+        from .trace import async_stop_trace
+
+        await async_stop_trace(call.data[CONF_ENTITY_ID])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_TRACE, async_start_trace, schema=START_TRACE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_STOP_TRACE, async_stop_trace, schema=STOP_TRACE_SCHEMA
+    )
+
+    websocket.async_register(hass)
+
     # Поддержка старого способа конфигурации через YAML
     if DOMAIN in config:
         hass.async_create_task(
@@ -42,9 +125,82 @@ async def async_setup(hass: HomeAssistant, config: dict):
     return True
 
 
+def parse_room_id(value) -> int | None:
+    """Convert room id from the form (string) to int."""
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _migrate_zone(zone: dict) -> dict:
+    """Convert zone config v1 (JSON/YAML strings) to native types."""
+    zone = dict(zone)
+
+    for key in ("zone", "goto"):
+        if isinstance(zone.get(key), str):
+            try:
+                zone[key] = json.loads(zone[key])
+            except (json.JSONDecodeError, TypeError):
+                _LOGGER.warning("Не удалось разобрать %s: %s", key, zone[key])
+                zone.pop(key)
+
+    if isinstance(zone.get(CONF_SEQUENCE), str):
+        # yaml нужен только для миграции старых записей - не грузим его при каждом старте
+        import yaml
+
+        try:
+            zone[CONF_SEQUENCE] = yaml.safe_load(zone[CONF_SEQUENCE])
+        except yaml.YAMLError:
+            _LOGGER.warning("Не удалось разобрать %s", CONF_SEQUENCE)
+            zone.pop(CONF_SEQUENCE)
+
+    if CONF_ROOM_ID in zone:
+        zone[CONF_ROOM_ID] = parse_room_id(zone[CONF_ROOM_ID])
+
+    for key in (CONF_CLEAN_TIMES, CONF_FAN_LEVEL, CONF_WATER_LEVEL, CONF_CLEAN_MODE, CONF_MOP_MODE):
+        if key in zone:
+            zone[key] = int(zone[key])
+
+    if CONF_ON in zone:
+        zone[CONF_ON] = bool(zone[CONF_ON])
+
+    return zone
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate old config entry."""
+    if entry.version == 1:
+        # v2: зоны хранятся в нативных типах, setup больше ничего не парсит
+        data = dict(entry.data)
+        data[CONF_ZONES] = {
+            zone_id: _migrate_zone(zone) for zone_id, zone in data.get(CONF_ZONES, {}).items()
+        }
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.debug("Конфигурация %s обновлена до версии 2", entry.entry_id)
+
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Vacuum Zones from a config entry."""
+    started = time.perf_counter()
     await hass.config_entries.async_forward_entry_setups(entry, ["vacuum", "select", "switch"])
+    # Профиль загрузки: импорт интеграции и настройка записи (вместе с импортом платформ)
+    setup_time = time.perf_counter() - started
+    _LOGGER.debug(
+        "Профиль загрузки %s: импорт %.1f мс, настройка %.1f мс",
+        entry.title,
+        IMPORT_TIME * 1000,
+        setup_time * 1000,
+    )
+    if IMPORT_TIME + setup_time > STARTUP_BUDGET:
+        _LOGGER.warning(
+            "Загрузка %s заняла %.0f мс, больше бюджета %.0f мс",
+            entry.title,
+            (IMPORT_TIME + setup_time) * 1000,
+            STARTUP_BUDGET * 1000,
+        )
 
     async def _update_listener(hass: HomeAssistant, updated_entry: ConfigEntry) -> None:
         # Если опции заполнены — переносим их в data, чтобы платформа читала актуальные значения
@@ -63,4 +219,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_forward_entry_unload(entry, "vacuum")
+    # Слушатели и таймеры зон снимаются через entry.async_on_unload платформы vacuum
+    return await hass.config_entries.async_unload_platforms(entry, ["vacuum", "select", "switch"])
+
+
+IMPORT_TIME = time.perf_counter() - _IMPORT_STARTED
@@ -0,0 +1,82 @@
+"""Area index of Vacuum Zones."""
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import area_registry, device_registry, entity_registry
+
+
+class AreaIndex:
+    """Индекс area_id -> виртуальные пылесосы.
+
+    Область зоны берётся из настроек зоны, затем из сущности, затем из её устройства.
+    Индекс перестраивается только по событиям реестров, которые касаются наших зон,
+    поэтому поиск зон по области не перебирает сущности.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._zones: dict[str, object] = {}  # {entity_id: ZoneVacuum}
+        self._index: dict[str, list] = {}
+        self._device_ids: set[str] = set()
+        self._unsubs = [
+            hass.bus.async_listen(area_registry.EVENT_AREA_REGISTRY_UPDATED, self._async_area_updated),
+            hass.bus.async_listen(entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_updated),
+            hass.bus.async_listen(device_registry.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_updated),
+        ]
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    @callback
+    def async_add(self, zone) -> None:
+        self._zones[zone.entity_id] = zone
+        self.async_rebuild()
+
+    @callback
+    def async_remove(self, zone) -> None:
+        if self._zones.pop(zone.entity_id, None) is not None:
+            self.async_rebuild()
+
+    @callback
+    def async_get(self, area_id: str) -> list:
+        return self._index.get(area_id, [])
+
+    @callback
+    def async_rebuild(self) -> None:
+        ent_reg = entity_registry.async_get(self.hass)
+        dev_reg = device_registry.async_get(self.hass)
+        areas = area_registry.async_get(self.hass)
+        index: dict[str, list] = {}
+        self._device_ids = set()
+        for entity_id, zone in self._zones.items():
+            area_id = zone.zone_area_id
+            if entry := ent_reg.async_get(entity_id):
+                area_id = area_id or entry.area_id
+                if entry.device_id:
+                    self._device_ids.add(entry.device_id)
+                    if not area_id and (device := dev_reg.async_get(entry.device_id)):
+                        area_id = device.area_id
+            if area_id and areas.async_get_area(area_id):
+                index.setdefault(area_id, []).append(zone)
+        self._index = index
+
+    @callback
+    def _async_area_updated(self, event: Event) -> None:
+        self.async_rebuild()
+
+    @callback
+    def _async_entity_updated(self, event: Event) -> None:
+        if event.data.get("entity_id") in self._zones:
+            self.async_rebuild()
+
+    @callback
+    def _async_device_updated(self, event: Event) -> None:
+        if event.data.get("device_id") in self._device_ids:
+            self.async_rebuild()
+
+    @callback
+    def async_stop(self) -> None:
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+        self._zones.clear()
+        self._index.clear()
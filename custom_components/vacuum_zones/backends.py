@@ -0,0 +1,81 @@
+"""Segment cleaning adapters for vacuum integrations.
+
+Адаптер знает, какие параметры комнаты интеграция принимает отдельно для каждого
+сегмента и какие может применить ко всему заходу, и собирает одну команду уборки
+на весь заход. Зоны с разными значениями параметров на весь заход планировщик
+разводит по заходам, а параметры, которые применить нельзя, заходы не делят.
+"""
+
+from homeassistant.const import ATTR_ENTITY_ID
+
+from .const import CONF_CLEAN_TIMES, CONF_FAN_LEVEL, CONF_WATER_LEVEL
+
+
+def segments(vacuum) -> list:
+    room = vacuum.service_data["segments"]
+    return room if isinstance(room, list) else [room]
+
+
+class Backend:
+    """vacuum_clean_segment only with the segment list (xiaomi_miio)."""
+
+    # Параметры, которые интеграция принимает по каждому сегменту
+    per_room: tuple = ()
+    # Параметры, которые применяются ко всему заходу (мощность - через vacuum.set_fan_speed)
+    run_wide: tuple = (CONF_FAN_LEVEL,)
+
+    def segment_call(self, entity_id: str, run: list) -> dict:
+        return {ATTR_ENTITY_ID: entity_id, "segments": [s for vacuum in run for s in segments(vacuum)]}
+
+
+class RoborockBackend(Backend):
+    """vacuum_clean_segment with one repeats value for the whole run."""
+
+    run_wide = (CONF_FAN_LEVEL, CONF_CLEAN_TIMES)
+
+    def segment_call(self, entity_id: str, run: list) -> dict:
+        data = super().segment_call(entity_id, run)
+        if clean_times := run[0].room_params.get(CONF_CLEAN_TIMES):
+            data["repeats"] = clean_times
+        return data
+
+
+class DreameBackend(Backend):
+    """vacuum_clean_segment with suction, water and repeats lists, one value per segment.
+
+    fan_level 1..4 -> suction_level 0..3, water_level -> water_volume 1..3
+    (у dreame нет нулевого уровня воды, поэтому 0 отправляется как минимальный).
+    """
+
+    per_room = (CONF_FAN_LEVEL, CONF_WATER_LEVEL, CONF_CLEAN_TIMES)
+    run_wide = ()
+
+    # Значения по умолчанию для зон без параметра, если он задан у других зон захода
+    defaults = {CONF_FAN_LEVEL: 2, CONF_WATER_LEVEL: 2, CONF_CLEAN_TIMES: 1}
+    fields = {
+        CONF_FAN_LEVEL: ("suction_level", lambda level: min(max(level - 1, 0), 3)),
+        CONF_WATER_LEVEL: ("water_volume", lambda level: min(max(level, 1), 3)),
+        CONF_CLEAN_TIMES: ("repeats", lambda times: max(times, 1)),
+    }
+
+    def segment_call(self, entity_id: str, run: list) -> dict:
+        data = super().segment_call(entity_id, run)
+        for param, (field, convert) in self.fields.items():
+            if all(param not in vacuum.room_params for vacuum in run):
+                continue
+            data[field] = [
+                convert(vacuum.room_params.get(param, self.defaults[param]))
+                for vacuum in run
+                for _ in segments(vacuum)
+            ]
+        return data
+
+
+BACKENDS = {
+    "dreame_vacuum": DreameBackend(),
+    "roborock": RoborockBackend(),
+}
+
+
+def get_backend(domain: str) -> Backend:
+    return BACKENDS.get(domain) or Backend()
@@ -23,9 +23,17 @@ from .const import (
     CONF_CLEAN_MODE,
     CONF_MOP_MODE,
     CONF_ON,
+    CONF_SCHEDULE,
+    CONF_AREA_ID,
+    CONF_MAP_ID,
+    CONF_MIN_INTERVAL,
     VALUE_TO_LABEL,
     PARAM_TO_NAME,
 )
+from . import parse_room_id
+from .maps import current_map_id
+from .registry import get_zone_index
+from .scheduler import parse_schedule
 
 
 async def get_available_zones(hass):
@@ -51,10 +59,17 @@ async def get_available_zones(hass):
         return DEFAULT_ROOMS
 
 
+def get_area_id(hass, name: str) -> str | None:
+    """Найти area_id по названию области (зоны создаются по названиям областей)."""
+    from homeassistant.helpers import area_registry
+    area = area_registry.async_get(hass).async_get_area_by_name(name)
+    return area.id if area else None
+
+
 class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Vacuum Zones."""
 
-    VERSION = 1
+    VERSION = 2
 
     def __init__(self):
         self.data = {}
@@ -96,12 +111,8 @@ class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     
                     return await self.async_step_add_zone()
 
-        # Получаем список всех виртуальных пылесосов для исключения
-        entity_reg = entity_registry.async_get(self.hass)
-        virtual_vacuums = []
-        for entity_id, entity in entity_reg.entities.items():
-            if entity.domain == "vacuum" and entity.platform == 'vacuum_zones':
-                virtual_vacuums.append(entity_id)
+        # Список виртуальных пылесосов для исключения берём из индекса, а не перебором реестра
+        virtual_vacuums = sorted(get_zone_index(self.hass).entity_ids)
 
         return self.async_show_form(
             step_id="user",
@@ -125,10 +136,15 @@ class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             zone_name = user_input[CONF_NAME]
             zone_id = zone_name.lower().replace(" ", "_")
             
+            try:
+                schedule = parse_schedule(user_input.get(CONF_SCHEDULE, ""))
+            except ValueError:
+                errors[CONF_SCHEDULE] = "invalid_schedule"
+
             # Проверяем уникальность ID зоны
             if zone_id in self.data.get(CONF_ZONES, {}):
                 errors[CONF_NAME] = "zone_exists"
-            else:
+            elif not errors:
                 # Инициализируем CONF_ZONES если его нет
                 if CONF_ZONES not in self.data:
                     self.data[CONF_ZONES] = {}
@@ -136,7 +152,7 @@ class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 # Собираем конфиг комнаты с дополнительными параметрами
                 self.data[CONF_ZONES][zone_id] = {
                     CONF_NAME: zone_name,
-                    CONF_ROOM_ID: user_input.get(CONF_ROOM_ID, ""),
+                    CONF_ROOM_ID: parse_room_id(user_input.get(CONF_ROOM_ID)),
                     # clean_times = repeats (1..2)
 
                     CONF_CLEAN_TIMES: int(user_input.get(CONF_CLEAN_TIMES, 1)),
@@ -145,7 +161,12 @@ class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     CONF_WATER_LEVEL: int(user_input.get(CONF_WATER_LEVEL, 1)),
                     CONF_CLEAN_MODE: int(user_input.get(CONF_CLEAN_MODE, 1)),
                     CONF_MOP_MODE: int(user_input.get(CONF_MOP_MODE, 0)),
-                    CONF_ON: user_input.get(CONF_ON, True),
+                    CONF_ON: bool(user_input.get(CONF_ON, True)),
+                    CONF_SCHEDULE: schedule,
+                    CONF_MIN_INTERVAL: int(user_input.get(CONF_MIN_INTERVAL, 0)),
+                    CONF_AREA_ID: get_area_id(self.hass, zone_name),
+                    # Комнаты относятся к карте, активной в момент настройки
+                    CONF_MAP_ID: current_map_id(self.hass.states.get(self.data[CONF_ENTITY_ID])),
                 }
                 
                 # После добавления зоны завершаем конфигурацию
@@ -220,6 +241,10 @@ class VacuumZonesConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 }),
                 # Включена ли уборка в комнате
                 vol.Optional(CONF_ON, default=True, description=PARAM_TO_NAME[CONF_ON]): bool,
+                # Расписание: времена запуска через запятую, например "08:00, 18:30"
+                vol.Optional(CONF_SCHEDULE, default=""): str,
+                # Не убирать повторно раньше чем через N минут (0 - всегда убирать)
+                vol.Optional(CONF_MIN_INTERVAL, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
             }),
             errors=errors,
             description_placeholders={"rooms_hint": rooms_hint},
@@ -251,53 +276,7 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
                 # Сохраняем zone_id для редактирования
                 self._edit_zone_id = zone_id
                 # Показываем форму редактирования сразу (без имени комнаты)
-                zone_config = self.zones[zone_id]
-                return self.async_show_form(
-                    step_id="edit_zone",
-                    data_schema=vol.Schema({
-                        # clean_times (1/2)
-                        vol.Required(CONF_CLEAN_TIMES, default=str(zone_config.get(CONF_CLEAN_TIMES, zone_config.get(CONF_CLEAN_TIMES, 1))), description=PARAM_TO_NAME[CONF_CLEAN_TIMES]): selector({
-                            "select": {
-                                "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_CLEAN_TIMES].items()],
-                                "mode": "dropdown"
-                            }
-                        }),
-                        # fan_level
-                        vol.Optional(CONF_FAN_LEVEL, default=str(zone_config.get(CONF_FAN_LEVEL, 2)), description=PARAM_TO_NAME[CONF_FAN_LEVEL]): selector({
-                            "select": {
-                                "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_FAN_LEVEL].items()],
-                                "mode": "dropdown"
-                            }
-                        }),
-                        # water_level
-                        vol.Optional(CONF_WATER_LEVEL, default=str(zone_config.get(CONF_WATER_LEVEL, 1)), description=PARAM_TO_NAME[CONF_WATER_LEVEL]): selector({
-                            "select": {
-                                "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_WATER_LEVEL].items()],
-                                "mode": "dropdown"
-                            }
-                        }),
-                        # clean_mode
-                        vol.Optional(CONF_CLEAN_MODE, default=str(zone_config.get(CONF_CLEAN_MODE, 1)), description=PARAM_TO_NAME[CONF_CLEAN_MODE]): selector({
-                            "select": {
-                                "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_CLEAN_MODE].items()],
-                                "mode": "dropdown"
-                            }
-                        }),
-                        # mop_mode
-                        vol.Optional(CONF_MOP_MODE, default=str(zone_config.get(CONF_MOP_MODE, 0)), description=PARAM_TO_NAME[CONF_MOP_MODE]): selector({
-                            "select": {
-                                "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_MOP_MODE].items()],
-                                "mode": "dropdown"
-                            }
-                        }),
-                        # on
-                        vol.Optional(CONF_ON, default=bool(zone_config.get(CONF_ON, True)), description=PARAM_TO_NAME[CONF_ON]): bool,
-                    }),
-                    description_placeholders={
-                        "zone_name": zone_config.get(CONF_NAME, zone_id),
-                        "room_id": zone_config.get(CONF_ROOM_ID, "N/A"),
-                    },
-                )
+                return self._show_edit_zone_form()
             elif user_input.get("delete_zone"):
                 zone_id = user_input["zone_to_delete"]
                 del self.zones[zone_id]
@@ -327,6 +306,62 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
             },
         )
 
+    def _show_edit_zone_form(self, errors: dict | None = None) -> FlowResult:
+        """Форма редактирования зоны с текущими значениями."""
+        zone_id = self._edit_zone_id
+        zone_config = self.zones[zone_id]
+        return self.async_show_form(
+            step_id="edit_zone",
+            data_schema=vol.Schema({
+                # clean_times (1/2)
+                vol.Required(CONF_CLEAN_TIMES, default=str(zone_config.get(CONF_CLEAN_TIMES, zone_config.get(CONF_CLEAN_TIMES, 1))), description=PARAM_TO_NAME[CONF_CLEAN_TIMES]): selector({
+                    "select": {
+                        "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_CLEAN_TIMES].items()],
+                        "mode": "dropdown"
+                    }
+                }),
+                # fan_level
+                vol.Optional(CONF_FAN_LEVEL, default=str(zone_config.get(CONF_FAN_LEVEL, 2)), description=PARAM_TO_NAME[CONF_FAN_LEVEL]): selector({
+                    "select": {
+                        "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_FAN_LEVEL].items()],
+                        "mode": "dropdown"
+                    }
+                }),
+                # water_level
+                vol.Optional(CONF_WATER_LEVEL, default=str(zone_config.get(CONF_WATER_LEVEL, 1)), description=PARAM_TO_NAME[CONF_WATER_LEVEL]): selector({
+                    "select": {
+                        "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_WATER_LEVEL].items()],
+                        "mode": "dropdown"
+                    }
+                }),
+                # clean_mode
+                vol.Optional(CONF_CLEAN_MODE, default=str(zone_config.get(CONF_CLEAN_MODE, 1)), description=PARAM_TO_NAME[CONF_CLEAN_MODE]): selector({
+                    "select": {
+                        "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_CLEAN_MODE].items()],
+                        "mode": "dropdown"
+                    }
+                }),
+                # mop_mode
+                vol.Optional(CONF_MOP_MODE, default=str(zone_config.get(CONF_MOP_MODE, 0)), description=PARAM_TO_NAME[CONF_MOP_MODE]): selector({
+                    "select": {
+                        "options": [{"label": lbl, "value": val} for val, lbl in VALUE_TO_LABEL[CONF_MOP_MODE].items()],
+                        "mode": "dropdown"
+                    }
+                }),
+                # on
+                vol.Optional(CONF_ON, default=bool(zone_config.get(CONF_ON, True)), description=PARAM_TO_NAME[CONF_ON]): bool,
+                # schedule
+                vol.Optional(CONF_SCHEDULE, default=", ".join(zone_config.get(CONF_SCHEDULE, []))): str,
+                # min_interval
+                vol.Optional(CONF_MIN_INTERVAL, default=int(zone_config.get(CONF_MIN_INTERVAL, 0))): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            }),
+            description_placeholders={
+                "zone_name": zone_config.get(CONF_NAME, zone_id),
+                "room_id": zone_config.get(CONF_ROOM_ID, "N/A"),
+            },
+            errors=errors or {},
+        )
+
     async def async_step_add_zone(self, user_input=None) -> FlowResult:
         """Handle adding a new zone."""
         errors = {}
@@ -335,18 +370,27 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
             zone_name = user_input[CONF_NAME]
             zone_id = zone_name.lower().replace(" ", "_")
             
+            try:
+                schedule = parse_schedule(user_input.get(CONF_SCHEDULE, ""))
+            except ValueError:
+                errors[CONF_SCHEDULE] = "invalid_schedule"
+
             if zone_id in self.zones:
                 errors[CONF_NAME] = "zone_exists"
-            else:
+            elif not errors:
                 self.zones[zone_id] = {
                     CONF_NAME: zone_name,
-                    CONF_ROOM_ID: user_input.get(CONF_ROOM_ID, ""),
+                    CONF_ROOM_ID: parse_room_id(user_input.get(CONF_ROOM_ID)),
                     CONF_CLEAN_TIMES: int(user_input.get(CONF_CLEAN_TIMES, 1)),
                     CONF_FAN_LEVEL: int(user_input.get(CONF_FAN_LEVEL, 2)),
                     CONF_WATER_LEVEL: int(user_input.get(CONF_WATER_LEVEL, 1)),
                     CONF_CLEAN_MODE: int(user_input.get(CONF_CLEAN_MODE, 1)),
                     CONF_MOP_MODE: int(user_input.get(CONF_MOP_MODE, 0)),
                     CONF_ON: bool(user_input.get(CONF_ON, True)),
+                    CONF_SCHEDULE: schedule,
+                    CONF_MIN_INTERVAL: int(user_input.get(CONF_MIN_INTERVAL, 0)),
+                    CONF_AREA_ID: get_area_id(self.hass, zone_name),
+                    CONF_MAP_ID: current_map_id(self.hass.states.get(self.data[CONF_ENTITY_ID])),
                 }
                 return await self.async_step_init()
 
@@ -395,6 +439,10 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
                 }),
                 # Включена ли уборка в комнате
                 vol.Optional(CONF_ON, default=True): bool,
+                # Расписание: времена запуска через запятую
+                vol.Optional(CONF_SCHEDULE, default=""): str,
+                # Не убирать повторно раньше чем через N минут (0 - всегда убирать)
+                vol.Optional(CONF_MIN_INTERVAL, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
             }),
             errors=errors,
         )
@@ -405,6 +453,11 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
         
         # Обрабатываем результат формы редактирования
         if user_input is not None and (CONF_CLEAN_TIMES in user_input or CONF_ON in user_input):
+            try:
+                schedule = parse_schedule(user_input.get(CONF_SCHEDULE, ""))
+            except ValueError:
+                errors[CONF_SCHEDULE] = "invalid_schedule"
+                return self._show_edit_zone_form(errors)
             zone_config = self.zones[self._edit_zone_id]
             # Обновляем значения (конвертируем строки в int)
             clean_times = int(user_input.get(CONF_CLEAN_TIMES, zone_config.get(CONF_CLEAN_TIMES, zone_config.get(CONF_CLEAN_TIMES, 1))))
@@ -414,6 +467,8 @@ class VacuumZonesOptionsFlowHandler(config_entries.OptionsFlow):
             zone_config[CONF_CLEAN_MODE] = int(user_input.get(CONF_CLEAN_MODE, zone_config.get(CONF_CLEAN_MODE, 1)))
             zone_config[CONF_MOP_MODE] = int(user_input.get(CONF_MOP_MODE, zone_config.get(CONF_MOP_MODE, 0)))
             zone_config[CONF_ON] = bool(user_input.get(CONF_ON, zone_config.get(CONF_ON, True)))
+            zone_config[CONF_MIN_INTERVAL] = int(user_input.get(CONF_MIN_INTERVAL, zone_config.get(CONF_MIN_INTERVAL, 0)))
+            zone_config[CONF_SCHEDULE] = schedule
             delattr(self, "_edit_zone_id")
             return await self.async_step_init()
         
@@ -7,6 +7,27 @@ DOMAIN = "vacuum_zones"
 CONF_ZONES = "zones"
 CONF_ROOM_NAME = "room_name"
 CONF_ROOM_ID = "room_id"
+# Ожидаемая длительность уборки зоны (в минутах), для сторожевого таймера
+CONF_DURATION = "duration"
+# Область Home Assistant, к которой относится зона
+CONF_AREA_ID = "area_id"
+# Карта, на которой находится зона (для пылесосов с несколькими картами)
+CONF_MAP_ID = "map_id"
+# Расписание зоны: список времён запуска "HH:MM"
+CONF_SCHEDULE = "schedule"
+# Не убирать зону повторно раньше чем через столько минут после успешной уборки
+CONF_MIN_INTERVAL = "min_interval"
+# Счётчик присутствия/движения: если он вырос на activity_threshold, зона убирается раньше
+CONF_ACTIVITY_ENTITY = "activity_entity"
+CONF_ACTIVITY_THRESHOLD = "activity_threshold"
+# Ждать ли окончания скрипта sequence перед командой уборки (false - скрипт идёт параллельно)
+CONF_WAIT_SEQUENCE = "wait_sequence"
+# Маршрут патрулирования: список точек [x, y], которые пылесос объезжает за один выезд
+CONF_ROUTE = "route"
+# Переставить точки маршрута так, чтобы путь был как можно короче
+CONF_OPTIMIZE_ROUTE = "optimize_route"
+# Симулятор родительского пылесоса для нагрузочного тестирования
+CONF_SIMULATOR = "simulator"
 
 
 # Дополнительные параметры комнаты
@@ -76,7 +97,69 @@ PARAM_ORDER = {
     CONF_WATER_LEVEL: "5",
 }
 
+# Атрибуты родительского пылесоса с текущей картой и комнатами
+MAP_ID_ATTRS = ("map_id", "current_map_id", "selected_map", "vacuum_extend.cur_map_id", "vacuum_extend.map_id")
+ROOM_INFO_ATTR = "vacuum_extend.room_info"
+# Атрибуты родительского пылесоса с комнатой, которую он убирает сейчас
+CURRENT_ROOM_ATTRS = ("current_segment", "current_room", "current_room_id", "vacuum_extend.cur_room_id")
+# Событие о зоне, убранной посреди общего захода
+EVENT_ROOM_DONE = f"{DOMAIN}_room_done"
+# Событие об отклонённых зонах с неактивной карты
+EVENT_MAP_REJECTED = f"{DOMAIN}_map_rejected"
+
+# Сервисы
+SERVICE_CLEAN_AREA = "clean_area"
+SERVICE_CLEAN_NOW = "clean_now"
+SERVICE_START_TRACE = "start_trace"
+SERVICE_STOP_TRACE = "stop_trace"
+
 # Задержка перед выполнением уборки для сбора всех запусков (в секундах)
 DELAY_BEFORE_CLEAN = 5
 
+# Заряд батареи (%), ниже которого возврат на базу считается подзарядкой посреди уборки
+RECHARGE_BATTERY_LEVEL = 20
+# Заряд батареи (%), после которого пылесос должен был продолжить уборку
+RECHARGED_BATTERY_LEVEL = 100
+# Расход батареи по умолчанию (% в секунду), пока нет истории уборок
+BATTERY_DRAIN = 0.01
+# Атрибуты родительского пылесоса со статусом задания и признаки подзарядки в них
+RECHARGE_STATUS_ATTRS = ("status", "task_status", "vacuum.status", "vacuum.task_status")
+RECHARGE_STATUS_MARKERS = ("recharg", "resume", "continue", "breakpoint")
+
+# Запуски по расписанию в пределах этого окна (в секундах) объединяются в одну команду
+SCHEDULE_WINDOW = 60
+
+# Ограничение облачных вызовов xiaomi_miot (token bucket): вызовов в секунду и запас
+RATE_LIMIT_RATE = 1
+RATE_LIMIT_BURST = 5
+
+# Хранилище очереди (переживает перезапуск Home Assistant)
+STORAGE_VERSION = 1
+# Задержка записи очереди на диск (в секундах)
+STORAGE_SAVE_DELAY = 10
+
+# Сторожевой таймер зависших заходов
+# Длительность зоны по умолчанию (в секундах), пока нет истории уборок
+DEFAULT_ZONE_DURATION = 30 * 60
+# Заход считается зависшим, если длится дольше ожидаемого в столько раз
+WATCHDOG_FACTOR = 2
+# Сколько раз повторять заход, если пылесос так и не начал уборку
+WATCHDOG_RETRIES = 1
+# Коэффициент сглаживания истории длительностей зон
+DURATION_SMOOTHING = 0.3
+# Событие о зависшем заходе
+EVENT_WATCHDOG = f"{DOMAIN}_watchdog"
+
+# Бюджет времени загрузки одной записи (импорт + настройка), в секундах
+STARTUP_BUDGET = 0.5
+
+# Трассы событий родительского пылесоса
+CONF_FILENAME = "filename"
+TRACE_VERSION = 1
+# Сколько строк трассы копить перед записью в файл
+TRACE_FLUSH_SIZE = 100
+EVENT_REPLAY_FINISHED = f"{DOMAIN}_replay_finished"
 
+# Подписка на изменения очередей
+SIGNAL_QUEUE_UPDATED = f"{DOMAIN}_queue_updated"
+WS_SUBSCRIBE = f"{DOMAIN}/subscribe"
@@ -0,0 +1,82 @@
+"""Outbound rate limiter for xiaomi_miot cloud calls."""
+
+import asyncio
+import time
+
+from homeassistant.core import HomeAssistant
+
+
+class RateLimiter:
+    """Token bucket для облачных вызовов одного родительского пылесоса.
+
+    Команды уборки (urgent) выполняются сразу, даже в долг, и поэтому не ждут.
+    Синхронизация настроек комнат ждёт токенов в очереди, а повторные обновления
+    одной и той же комнаты, ещё не отправленные в облако, схлопываются в одно.
+    """
+
+    def __init__(self, hass: HomeAssistant, rate: float, burst: int):
+        self.hass = hass
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        # {key: [domain, service, data, future]} - порядок вставки сохраняется
+        self._queue: dict = {}
+        self._worker: asyncio.Task | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def async_call(
+        self, domain: str, service: str, data: dict, key=None, urgent: bool = False
+    ) -> None:
+        if urgent:
+            self._refill()
+            self.tokens -= 1
+            await self.hass.services.async_call(domain, service, data, True)
+            return
+
+        if key is not None and key in self._queue:
+            # Обновление той же комнаты ещё в очереди - отправим только последнее
+            request = self._queue[key]
+            request[2] = data
+            future = request[3]
+        else:
+            future = self.hass.loop.create_future()
+            self._queue[key if key is not None else object()] = [domain, service, data, future]
+
+        if self._worker is None:
+            self._worker = self.hass.async_create_task(self._async_work())
+
+        await asyncio.shield(future)
+
+    async def _async_work(self) -> None:
+        try:
+            while self._queue:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    continue
+                self.tokens -= 1
+
+                key = next(iter(self._queue))
+                domain, service, data, future = self._queue.pop(key)
+                try:
+                    await self.hass.services.async_call(domain, service, data, True)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            self._worker = None
+
+    def async_cancel(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+        for *_, future in self._queue.values():
+            future.cancel()
+        self._queue.clear()
@@ -0,0 +1,70 @@
+"""Multi-map awareness of Vacuum Zones."""
+
+import json
+
+from homeassistant.core import State
+
+from .const import MAP_ID_ATTRS, ROOM_INFO_ATTR
+
+
+def current_map_id(state: State | None) -> str | None:
+    """Return id of the map the parent vacuum works on, if it reports one."""
+    if state is None:
+        return None
+    for attr in MAP_ID_ATTRS:
+        if (value := state.attributes.get(attr)) not in (None, ""):
+            return str(value)
+    return None
+
+
+def parse_room_ids(room_info) -> set[int]:
+    """Room ids from vacuum_extend.room_info: {"room_attrs": [header, [id, name, ...], ...]}."""
+    if isinstance(room_info, str):
+        try:
+            room_info = json.loads(room_info)
+        except (json.JSONDecodeError, TypeError):
+            return set()
+    if not isinstance(room_info, dict):
+        return set()
+    rooms = set()
+    for row in room_info.get("room_attrs", [])[1:]:
+        if isinstance(row, (list, tuple)) and row:
+            try:
+                rooms.add(int(row[0]))
+            except (TypeError, ValueError):
+                pass
+    return rooms
+
+
+class MapRooms:
+    """Кэш комнат каждой карты родительского пылесоса.
+
+    room_info разбирается только при изменении атрибута, а комнаты запоминаются
+    для той карты, которая была активна в этот момент.
+    """
+
+    def __init__(self):
+        self.rooms: dict[str, set[int]] = {}
+        self.active: str | None = None
+        self._room_info = None
+
+    def update(self, state: State | None) -> None:
+        self.active = current_map_id(state)
+        if state is None or self.active is None:
+            return
+        room_info = state.attributes.get(ROOM_INFO_ATTR)
+        if room_info is None or room_info is self._room_info or room_info == self._room_info:
+            return
+        self._room_info = room_info
+        if rooms := parse_room_ids(room_info):
+            self.rooms[self.active] = rooms
+
+    def accepts(self, map_id, room_ids: list[int]) -> bool:
+        """Можно ли убирать эти комнаты на активной карте."""
+        if self.active is None:
+            # Пылесос не сообщает карту - не ограничиваем
+            return True
+        if map_id not in (None, "") and str(map_id) != self.active:
+            return False
+        known = self.rooms.get(self.active)
+        return not known or all(room in known for room in room_ids)
@@ -0,0 +1,112 @@
+"""Run planner of Vacuum Zones.
+
+Пылесосы без настроек по комнатам применяют мощность, уровень воды и режим ко всему заходу,
+поэтому зоны с одинаковыми параметрами объединяются в один заход,
+а заходы упорядочиваются так, чтобы параметры менялись как можно реже.
+
+Большие пакеты комнат делятся на части, каждая из которых укладывается в заряд батареи.
+Точки маршрута патрулирования упорядочиваются по кратчайшему пути.
+"""
+
+import math
+
+from .const import (
+    CONF_CLEAN_TIMES,
+    CONF_FAN_LEVEL,
+    CONF_WATER_LEVEL,
+    CONF_CLEAN_MODE,
+    CONF_MOP_MODE,
+)
+
+# Параметры, которые применяются ко всему заходу
+ROOM_PARAMS = (CONF_FAN_LEVEL, CONF_WATER_LEVEL, CONF_CLEAN_MODE, CONF_MOP_MODE, CONF_CLEAN_TIMES)
+
+
+def params_key(params: dict, run_wide: tuple = ROOM_PARAMS) -> tuple:
+    """Run settings of a zone, only the ones the vacuum can apply to the whole run.
+
+    Параметры, которые пылесос принимает по комнатам или не умеет применять вовсе,
+    не должны делить зоны на заходы.
+    """
+    return tuple(params.get(param) if param in run_wide else None for param in ROOM_PARAMS)
+
+
+def count_switches(current: tuple | None, key: tuple) -> int:
+    """Number of settings that change between two runs."""
+    if current is None:
+        return 0
+    return sum(a != b for a, b in zip(current, key))
+
+
+def plan_runs(
+    vacuums: list, current: tuple | None = None, run_wide: tuple = ROOM_PARAMS
+) -> list[tuple[tuple, list]]:
+    """Group zones by identical parameters and order groups by fewest switches.
+
+    Возвращает список (параметры, зоны). Порядок жадный: следующим идёт заход,
+    который меньше всего отличается от предыдущего (или от текущих настроек пылесоса).
+    """
+    groups: dict[tuple, list] = {}
+    for vacuum in vacuums:
+        groups.setdefault(params_key(vacuum.room_params, run_wide), []).append(vacuum)
+
+    plan = []
+    while groups:
+        # min возвращает первый минимальный - при равенстве сохраняем порядок запуска
+        key = min(groups, key=lambda k: count_switches(current, k))
+        plan.append((key, groups.pop(key)))
+        current = key
+    return plan
+
+
+def split_by_battery(vacuums: list, costs: list[float], budget: float) -> tuple[list, list]:
+    """Zones that fit into the battery budget now, and zones left for after a top-up.
+
+    Комнаты не делятся: зона либо целиком попадает в текущую часть, либо ждёт.
+    Первая зона берётся всегда, иначе пакет никогда не начнётся.
+    """
+    chunk, rest = [], []
+    for vacuum, cost in zip(vacuums, costs):
+        if not chunk or cost <= budget:
+            chunk.append(vacuum)
+            budget -= cost
+        else:
+            rest.append(vacuum)
+    return chunk, rest
+
+
+def route_length(points: list) -> float:
+    return sum(math.dist(a, b) for a, b in zip(points, points[1:]))
+
+
+def order_route(points: list) -> list:
+    """Shortest open path through the points, starting from the first one.
+
+    Ближайший сосед, затем улучшение 2-opt. Точек в маршруте единицы-десятки,
+    поэтому квадратичного перебора достаточно.
+    """
+    if len(points) < 3:
+        return list(points)
+
+    route = [points[0]]
+    rest = list(points[1:])
+    while rest:
+        nearest = min(rest, key=lambda point: math.dist(route[-1], point))
+        rest.remove(nearest)
+        route.append(nearest)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 1):
+            for j in range(i + 1, len(route)):
+                # Разворачиваем участок route[i..j], если путь становится короче
+                before = math.dist(route[i - 1], route[i])
+                after = math.dist(route[i - 1], route[j])
+                if j + 1 < len(route):
+                    before += math.dist(route[j], route[j + 1])
+                    after += math.dist(route[i], route[j + 1])
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route
@@ -0,0 +1,75 @@
+"""Index of Vacuum Zones entities in the entity registry."""
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry
+
+from .const import DOMAIN
+
+
+class ZoneEntityIndex:
+    """Множество entity_id виртуальных пылесосов vacuum_zones.
+
+    Начальное заполнение идёт по записям наших config entry (индекс реестра)
+    и по зонам из YAML, которые регистрируются сами при добавлении в HA.
+    Дальше индекс обновляется по событиям реестра, поэтому форме настройки
+    не нужно перебирать все сущности реестра.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.entity_ids: set[str] = set()
+        ent_reg = entity_registry.async_get(hass)
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            for entity in entity_registry.async_entries_for_config_entry(ent_reg, entry.entry_id):
+                if entity.domain == "vacuum":
+                    self.entity_ids.add(entity.entity_id)
+        self._unsub = hass.bus.async_listen(
+            entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_updated
+        )
+
+    @callback
+    def async_add(self, entity_id: str) -> None:
+        self.entity_ids.add(entity_id)
+
+    @callback
+    def _async_entity_updated(self, event: Event) -> None:
+        action = event.data.get("action")
+        entity_id = event.data.get("entity_id")
+        if action == "remove":
+            self.entity_ids.discard(entity_id)
+            return
+        if action == "update" and (old_entity_id := event.data.get("old_entity_id")):
+            # Переименование: меняем id, только если это наша сущность
+            if old_entity_id in self.entity_ids:
+                self.entity_ids.discard(old_entity_id)
+                self.entity_ids.add(entity_id)
+            return
+        if action == "create":
+            entry = entity_registry.async_get(self.hass).async_get(entity_id)
+            if entry and entry.domain == "vacuum" and entry.platform == DOMAIN:
+                self.entity_ids.add(entity_id)
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        self.entity_ids.clear()
+
+
+_zone_index: ZoneEntityIndex | None = None
+
+
+def get_zone_index(hass: HomeAssistant) -> ZoneEntityIndex:
+    global _zone_index
+    if _zone_index is None:
+        _zone_index = ZoneEntityIndex(hass)
+    return _zone_index
+
+
+def release_zone_index() -> None:
+    """Stop the zone index together with the last zone."""
+    global _zone_index
+    if _zone_index is not None:
+        _zone_index.async_stop()
+        _zone_index = None
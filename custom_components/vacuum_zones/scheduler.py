@@ -0,0 +1,85 @@
+"""Built-in zone schedule of Vacuum Zones."""
+
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+from typing import Callable, Coroutine
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import SCHEDULE_WINDOW
+
+
+def parse_schedule(value) -> list[str]:
+    """Convert "08:00, 18:30" or a list of times to a list of "HH:MM" strings."""
+    if isinstance(value, str):
+        value = [item for item in value.replace(";", ",").split(",") if item.strip()]
+    result = []
+    for item in value or []:
+        parsed = time.fromisoformat(str(item).strip())
+        result.append(parsed.strftime("%H:%M"))
+    return result
+
+
+def next_run(at: str, after: datetime) -> datetime:
+    """Ближайшее время запуска по местному времени строго позже after (в UTC)."""
+    local = dt_util.as_local(after)
+    run = local.replace(
+        hour=int(at[:2]), minute=int(at[3:5]), second=0, microsecond=0
+    )
+    if run <= local:
+        run += timedelta(days=1)
+    return dt_util.as_utc(run)
+
+
+class Scheduler:
+    """Один таймер на все расписания зон одного родительского пылесоса.
+
+    Запуски хранятся в куче по времени, таймер всегда стоит только на ближайший.
+    Зоны, которые должны начаться в пределах SCHEDULE_WINDOW, запускаются вместе.
+    """
+
+    def __init__(self, hass: HomeAssistant, on_due: Callable[[list], Coroutine]):
+        self.hass = hass
+        self.on_due = on_due
+        self._heap: list[tuple[datetime, int, str, object]] = []
+        self._counter = itertools.count()
+        self._cancel: Callable | None = None
+
+    @callback
+    def async_add(self, vacuum, schedule: list[str]) -> None:
+        now = dt_util.utcnow()
+        for at in schedule:
+            heapq.heappush(self._heap, (next_run(at, now), next(self._counter), at, vacuum))
+        self._schedule()
+
+    @callback
+    def async_stop(self) -> None:
+        if self._cancel:
+            self._cancel()
+            self._cancel = None
+        self._heap.clear()
+
+    def _schedule(self) -> None:
+        if self._cancel:
+            self._cancel()
+            self._cancel = None
+        if self._heap:
+            self._cancel = async_track_point_in_utc_time(
+                self.hass, self._async_fired, self._heap[0][0]
+            )
+
+    async def _async_fired(self, now: datetime) -> None:
+        self._cancel = None
+        limit = now + timedelta(seconds=SCHEDULE_WINDOW)
+        due = []
+        while self._heap and self._heap[0][0] <= limit:
+            _, _, at, vacuum = heapq.heappop(self._heap)
+            if vacuum not in due:
+                due.append(vacuum)
+            heapq.heappush(self._heap, (next_run(at, limit), next(self._counter), at, vacuum))
+        self._schedule()
+        if due:
+            await self.on_due(due)
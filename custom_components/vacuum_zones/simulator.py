@@ -0,0 +1,233 @@
+"""Simulated parent vacuum for local load and latency testing.
+
+Включается только из YAML (секция `simulator`), в рабочих установках не используется.
+Регистрирует заглушки сервисов vacuum_clean_segment, vacuum_clean_zone,
+vacuum_goto и xiaomi_miot.call_action с настраиваемой задержкой и долей ошибок.
+Параметр `platform` задаёт интеграцию, которую изображает симулятор: от неё зависит,
+как зоны отправляют команды (например, комнаты xiaomi_miot уходят через call_action).
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import voluptuous as vol
+from homeassistant.components.vacuum import StateVacuumEntity, VacuumEntityFeature
+from homeassistant.const import CONF_PLATFORM, STATE_IDLE, STATE_PAUSED
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry
+
+from .const import DOMAIN, CONF_SIMULATOR
+from .vacuum import STATE_CLEANING, STATE_DOCKED, STATE_RETURNING, _simulated_platforms
+
+CONF_LATENCY = "latency"
+CONF_LATENCY_JITTER = "latency_jitter"
+CONF_FAILURE_RATE = "failure_rate"
+CONF_ROOM_DURATION = "room_duration"
+CONF_RETURN_DURATION = "return_duration"
+CONF_BATTERY_DRAIN = "battery_drain"
+CONF_ROOMS = "rooms"
+
+SIMULATOR_UNIQUE_ID = f"{DOMAIN}_{CONF_SIMULATOR}"
+# Интеграции, сервисы которых умеет изображать симулятор
+SIMULATED_PLATFORMS = (DOMAIN, "xiaomi_miot", "xiaomi_miio", "roborock", "dreame_vacuum")
+
+SIMULATOR_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_PLATFORM, default=DOMAIN): vol.In(SIMULATED_PLATFORMS),
+        vol.Optional(CONF_LATENCY, default=0.5): vol.Coerce(float),
+        vol.Optional(CONF_LATENCY_JITTER, default=0.2): vol.Coerce(float),
+        vol.Optional(CONF_FAILURE_RATE, default=0.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=1)
+        ),
+        vol.Optional(CONF_ROOM_DURATION, default=30): vol.Coerce(float),
+        vol.Optional(CONF_RETURN_DURATION, default=10): vol.Coerce(float),
+        # Расход заряда на одну комнату (в процентах)
+        vol.Optional(CONF_BATTERY_DRAIN, default=5): vol.Coerce(float),
+        vol.Optional(CONF_ROOMS, default={}): {vol.Coerce(int): str},
+    }
+)
+
+
+async def async_setup_simulator(hass: HomeAssistant, config: dict, async_add_entities):
+    """Create the simulated vacuum and register service stand-ins."""
+    config = SIMULATOR_SCHEMA(config)
+
+    # Регистрируем сущность заранее, чтобы виртуальные пылесосы нашли её платформу
+    entry = entity_registry.async_get(hass).async_get_or_create(
+        "vacuum", DOMAIN, SIMULATOR_UNIQUE_ID, suggested_object_id=SIMULATOR_UNIQUE_ID
+    )
+    platform = config[CONF_PLATFORM]
+    _simulated_platforms[entry.entity_id] = platform
+    vacuum = SimulatedVacuum(config)
+    async_add_entities([vacuum])
+
+    async def clean_segment(call: ServiceCall):
+        segments = call.data["segments"]
+        await vacuum.async_command(segments if isinstance(segments, list) else [segments])
+
+    async def clean_zone(call: ServiceCall):
+        zones = call.data["zone"]
+        await vacuum.async_command([f"zone{i}" for i in range(len(zones))], call.data.get("repeats", 1))
+
+    async def goto(call: ServiceCall):
+        await vacuum.async_command([f"{call.data['x_coord']},{call.data['y_coord']}"], goto=True)
+
+    async def call_action(call: ServiceCall):
+        params = call.data.get("params")
+        if call.data.get("aiid") == 10:
+            # Сохранение настроек комнат
+            await vacuum.async_command(None)
+            for attrs in json.loads(params).get("room_attrs", []):
+                vacuum.room_attrs[attrs["id"]] = attrs
+        elif call.data.get("aiid") == 13:
+            rooms = json.loads(params[0]).get("room", [])
+            await vacuum.async_command(
+                rooms, max((vacuum.room_attrs.get(i, {}).get("clean_times", 1) for i in rooms), default=1)
+            )
+
+    # Не перекрываем сервисы настоящей интеграции, если она установлена
+    for service, handler in (
+        ("vacuum_clean_segment", clean_segment),
+        ("vacuum_clean_zone", clean_zone),
+        ("vacuum_goto", goto),
+    ):
+        if platform == DOMAIN or not hass.services.has_service(platform, service):
+            hass.services.async_register(platform, service, handler)
+    if not hass.services.has_service("xiaomi_miot", "call_action"):
+        hass.services.async_register("xiaomi_miot", "call_action", call_action)
+
+
+class SimulatedVacuum(StateVacuumEntity):
+    _attr_name = "Vacuum Zones Simulator"
+    _attr_unique_id = SIMULATOR_UNIQUE_ID
+    _attr_should_poll = False
+    _attr_state = STATE_DOCKED
+    _attr_supported_features = (
+        VacuumEntityFeature.START
+        | VacuumEntityFeature.STOP
+        | VacuumEntityFeature.PAUSE
+        | VacuumEntityFeature.RETURN_HOME
+        | VacuumEntityFeature.BATTERY
+        | VacuumEntityFeature.STATE
+    )
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.room_attrs: dict[int, dict] = {}
+        self.rooms: list = []
+        self.current_room = None
+        self._attr_battery_level = 100
+        self._task: asyncio.Task | None = None
+        self._resume = asyncio.Event()
+        self._goto = False
+        self._resume.set()
+        # Статистика вызовов для оценки пропускной способности и задержек
+        self.latencies: list[float] = []
+        self.failures = 0
+
+    @property
+    def activity(self):  # HA 2026.1+
+        if isinstance(STATE_CLEANING, str):
+            return None
+        from homeassistant.components.vacuum import VacuumActivity
+
+        return VacuumActivity(self._attr_state)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "current_room": self.current_room,
+            "rooms_left": len(self.rooms),
+            "commands": len(latencies),
+            "failed_commands": self.failures,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "vacuum_extend.room_info": json.dumps(
+                {"room_attrs": [["id", "name"]] + [[k, v] for k, v in self.config[CONF_ROOMS].items()]}
+            ),
+        }
+
+    async def async_command(self, rooms: list | None, repeats: int = 1, goto: bool = False) -> None:
+        """Имитирует облачный вызов: задержка, случайная ошибка, затем запуск уборки."""
+        begin = time.monotonic()
+        await asyncio.sleep(
+            max(0, self.config[CONF_LATENCY] + random.uniform(-1, 1) * self.config[CONF_LATENCY_JITTER])
+        )
+        self.latencies.append(time.monotonic() - begin)
+        if random.random() < self.config[CONF_FAILURE_RATE]:
+            self.failures += 1
+            self.async_write_ha_state()
+            raise HomeAssistantError("Simulated cloud failure")
+
+        if rooms is not None:
+            self.rooms = [room for room in rooms for _ in range(repeats)]
+            self._goto = goto
+            self._start_task()
+        self.async_write_ha_state()
+
+    def _start_task(self) -> None:
+        if self._task:
+            self._task.cancel()
+        self._resume.set()
+        self._task = self.hass.async_create_task(self._async_run())
+
+    async def _async_run(self) -> None:
+        self._set_state(STATE_CLEANING)
+        while self.rooms:
+            await self._resume.wait()
+            self.current_room = self.rooms[0]
+            self.async_write_ha_state()
+            await asyncio.sleep(self.config[CONF_ROOM_DURATION])
+            await self._resume.wait()
+            self.rooms.pop(0)
+            self._attr_battery_level = max(
+                0, self._attr_battery_level - self.config[CONF_BATTERY_DRAIN]
+            )
+        self.current_room = None
+        if self._goto:
+            # Как настоящий пылесос: доехал до точки и ждёт на месте
+            self._set_state(STATE_IDLE)
+            return
+        await self._async_return()
+
+    async def _async_return(self) -> None:
+        self._set_state(STATE_RETURNING)
+        await asyncio.sleep(self.config[CONF_RETURN_DURATION])
+        self._attr_battery_level = 100
+        self._set_state(STATE_DOCKED)
+
+    def _set_state(self, state) -> None:
+        self._attr_state = state
+        self.async_write_ha_state()
+
+    async def async_start(self) -> None:
+        if self._attr_state == STATE_PAUSED and self._task:
+            self._resume.set()
+            self._set_state(STATE_CLEANING)
+            return
+        self.rooms = self.rooms or ["all"]
+        self._start_task()
+
+    async def async_pause(self) -> None:
+        if self._attr_state != STATE_CLEANING:
+            return
+        self._resume.clear()
+        self._set_state(STATE_PAUSED)
+
+    async def async_stop(self, **kwargs) -> None:
+        if self._task:
+            self._task.cancel()
+        self.rooms = []
+        self.current_room = None
+        self._set_state(STATE_IDLE)
+
+    async def async_return_to_base(self, **kwargs) -> None:
+        if self._task:
+            self._task.cancel()
+        self.rooms = []
+        self.current_room = None
+        self._task = self.hass.async_create_task(self._async_return())
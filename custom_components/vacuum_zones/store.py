@@ -0,0 +1,62 @@
+"""Persistent storage of the zone queue for Vacuum Zones."""
+
+from typing import Callable, Coroutine
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_VERSION, STORAGE_SAVE_DELAY
+
+
+class QueueStore:
+    """Write-behind хранилище очереди одного родительского пылесоса.
+
+    Снимок (очередь, ожидающие запуски и текущая уборка) собирается функцией
+    data_func в момент записи, поэтому частые изменения сливаются в одну запись.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_id: str):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entity_id}")
+        self.data_func: Callable[[], dict] | None = None
+        # Снимок, загруженный при старте и ещё не восстановленный
+        self.restored: dict | None = None
+        # Вызывается, когда все виртуальные пылесосы добавлены в HA
+        self.on_ready: Callable[[], Coroutine] | None = None
+        self._waiting: set[str] = set()
+        # История длительностей зон для сторожевого таймера
+        self.durations: dict[str, float] = {}
+        # Время последней успешной уборки зон и показания счётчика активности на тот момент
+        self.last_cleaned: dict[str, float] = {}
+        self.activity: dict[str, float] = {}
+        # Измеренный расход батареи родительского пылесоса (% в секунду)
+        self.battery_drain: float | None = None
+
+    async def async_load(self, unique_ids: list[str]) -> None:
+        self.restored = await self._store.async_load()
+        if self.restored:
+            self.durations.update(self.restored.get("durations", {}))
+            self.last_cleaned.update(self.restored.get("last_cleaned", {}))
+            self.activity.update(self.restored.get("activity", {}))
+            self.battery_drain = self.restored.get("battery_drain")
+        self._waiting = set(unique_ids)
+
+    @callback
+    def async_entity_added(self, unique_id: str) -> None:
+        self._waiting.discard(unique_id)
+        if not self._waiting and self.on_ready:
+            self.hass.async_create_task(self.on_ready())
+
+    @callback
+    def async_schedule_save(self) -> None:
+        # Пока снимок не восстановлен, не перезаписываем его начальными состояниями
+        if self.restored is not None or self.data_func is None:
+            return
+        self._store.async_delay_save(self.data_func, STORAGE_SAVE_DELAY)
+
+    async def async_unload(self) -> None:
+        """Сразу записываем отложенный снимок, чтобы после перезагрузки записи очередь восстановилась."""
+        self.on_ready = None
+        if self.restored is not None or self.data_func is None:
+            return
+        await self._store.async_save(self.data_func())
@@ -0,0 +1,251 @@
+"""Record and replay of parent vacuum event traces.
+
+Трасса - файл JSON Lines: заголовок, затем изменения состояния родительского пылесоса
+(только изменившиеся атрибуты), команды зонам (входы) и вызовы сервисов для самого
+пылесоса (выходы), с временем от начала записи. Воспроизведение - только для тестового
+стенда: оно подаёт состояния и команды обратно с ускорением, глушит исходящие сервисы
+и сравнивает вызовы, которые сделали зоны, с записанными.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from homeassistant.components.vacuum import DOMAIN as VACUUM_DOMAIN
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_CALL_SERVICE, EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN, EVENT_REPLAY_FINISHED, SERVICE_CLEAN_NOW, TRACE_FLUSH_SIZE, TRACE_VERSION
+from .vacuum import _zones
+
+_LOGGER = logging.getLogger(__name__)
+
+# Команды зонам, которые пишутся в трассу как входы
+INPUT_SERVICES = {
+    (VACUUM_DOMAIN, "start"),
+    (VACUUM_DOMAIN, "stop"),
+    (VACUUM_DOMAIN, "pause"),
+    (DOMAIN, SERVICE_CLEAN_NOW),
+}
+
+
+def _targets(service_data: dict, entity_ids) -> bool:
+    target = service_data.get(ATTR_ENTITY_ID)
+    return any(item in entity_ids for item in (target if isinstance(target, list) else [target]))
+
+
+def _call(event: Event) -> dict:
+    return {
+        "call": f"{event.data.get('domain')}.{event.data.get('service')}",
+        "data": event.data.get("service_data") or {},
+    }
+
+
+def _dumps(line: dict) -> str:
+    return json.dumps(line, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _append(path: str, lines: list[str]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+class TraceRecorder:
+    """Пишет события одного родительского пылесоса в файл трассы."""
+
+    def __init__(self, hass: HomeAssistant, entity_id: str, path: str):
+        self.hass = hass
+        self.entity_id = entity_id
+        self.path = path
+        self._started = time.monotonic()
+        self._attrs: dict = {}
+        self._buffer: list[str] = []
+        # Последняя запись в файл: каждая следующая ждёт предыдущую, чтобы строки шли по порядку
+        self._writing: asyncio.Task | None = None
+        self._unsubs: list = []
+
+    async def async_start(self) -> None:
+        state = self.hass.states.get(self.entity_id)
+        # Файл каждый раз пишется заново
+        await self.hass.async_add_executor_job(
+            lambda: open(self.path, "w", encoding="utf-8").close()
+        )
+        self._buffer.append(_dumps({"v": TRACE_VERSION, ATTR_ENTITY_ID: self.entity_id}))
+        if state:
+            self._record_state(state.state, dict(state.attributes))
+        self._unsubs = [
+            self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_state_changed),
+            self.hass.bus.async_listen(EVENT_CALL_SERVICE, self._async_call_service),
+        ]
+
+    @callback
+    def _record_state(self, state: str, attrs: dict) -> None:
+        # Только изменившиеся атрибуты, удалённые - как null
+        diff = {key: value for key, value in attrs.items() if self._attrs.get(key) != value}
+        diff.update({key: None for key in self._attrs if key not in attrs})
+        self._attrs = attrs
+        self._write({"state": str(state), "attrs": diff})
+
+    @callback
+    def _write(self, line: dict) -> None:
+        self._buffer.append(_dumps({"t": round(time.monotonic() - self._started, 3)} | line))
+        if len(self._buffer) >= TRACE_FLUSH_SIZE:
+            self._flush()
+
+    @callback
+    def _flush(self) -> None:
+        if self._buffer:
+            lines, self._buffer = self._buffer, []
+            self._writing = self.hass.async_create_task(self._async_write(self._writing, lines))
+
+    async def _async_write(self, previous: asyncio.Task | None, lines: list[str]) -> None:
+        if previous:
+            await previous
+        await self.hass.async_add_executor_job(_append, self.path, lines)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        if event.data.get(ATTR_ENTITY_ID) != self.entity_id:
+            return
+        if new_state := event.data.get("new_state"):
+            self._record_state(new_state.state, dict(new_state.attributes))
+
+    @callback
+    def _async_call_service(self, event: Event) -> None:
+        data = event.data.get("service_data") or {}
+        if _targets(data, {self.entity_id}):
+            self._write(_call(event))
+        elif (event.data.get("domain"), event.data.get("service")) in INPUT_SERVICES and _targets(
+            data, {vacuum.entity_id for vacuum in _zones.get(self.entity_id, [])}
+        ):
+            call = _call(event)
+            self._write({"input": call.pop("call")} | call)
+
+    async def async_stop(self) -> None:
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+        self._flush()
+        if self._writing:
+            await self._writing
+            self._writing = None
+
+
+def load_trace(path: str) -> tuple[dict, list[dict]]:
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("v") != TRACE_VERSION:
+        raise ValueError(f"Unsupported trace file: {path}")
+    return lines[0], lines[1:]
+
+
+def _stub_services(hass: HomeAssistant, entity_id: str, calls: list[dict]) -> list[tuple[str, str]]:
+    """Глушим исходящие сервисы трассы, чтобы воспроизведение не дошло до настоящего пылесоса.
+
+    Возвращает зарегистрированные заглушки.
+    """
+    component = hass.data.get(VACUUM_DOMAIN)
+    if component is not None and component.get_entity(entity_id) is not None:
+        raise HomeAssistantError(f"{entity_id} is a real vacuum, replay a trace on a test instance only")
+
+    async def stub(call: ServiceCall) -> None:
+        pass
+
+    stubs = []
+    for domain, service in {tuple(line["call"].split(".", 1)) for line in calls}:
+        # Сервисы vacuum для родителя без сущности никуда не уходят
+        if domain == VACUUM_DOMAIN:
+            continue
+        if hass.services.has_service(domain, service):
+            raise HomeAssistantError(f"{domain}.{service} is registered, replay would call it")
+        hass.services.async_register(domain, service, stub)
+        stubs.append((domain, service))
+    return stubs
+
+
+async def async_replay(hass: HomeAssistant, path: str, speed: float = 10) -> dict:
+    """Feed a trace back into a test instance and compare service calls with the recorded ones.
+
+    Родительский пылесос здесь - только состояние без сущности, исходящие сервисы
+    заменяются заглушками, а записанные команды зонам вызываются заново.
+    """
+    header, lines = await hass.async_add_executor_job(load_trace, path)
+    entity_id = header[ATTR_ENTITY_ID]
+    recorded = [line for line in lines if "call" in line]
+    replayed: list[dict] = []
+    stubs = _stub_services(hass, entity_id, recorded)
+
+    @callback
+    def _async_call_service(event: Event) -> None:
+        if _targets(event.data.get("service_data") or {}, {entity_id}):
+            replayed.append(_call(event))
+
+    unsub = hass.bus.async_listen(EVENT_CALL_SERVICE, _async_call_service)
+    started = time.monotonic()
+    attrs: dict = {}
+    try:
+        for line in lines:
+            if "call" in line:
+                continue
+            if (delay := line["t"] / speed - (time.monotonic() - started)) > 0:
+                await asyncio.sleep(delay)
+            if "input" in line:
+                domain, service = line["input"].split(".", 1)
+                await hass.services.async_call(domain, service, line["data"], blocking=True)
+                continue
+            attrs = {
+                key: value
+                for key, value in (attrs | line["attrs"]).items()
+                if value is not None
+            }
+            hass.states.async_set(entity_id, line["state"], attrs)
+        # Даём зонам отработать последнее событие
+        await asyncio.sleep(0)
+        await hass.async_block_till_done()
+    finally:
+        unsub()
+        for domain, service in stubs:
+            hass.services.async_remove(domain, service)
+
+    mismatch = next(
+        (
+            i for i, (a, b) in enumerate(zip(recorded, replayed))
+            if a["call"] != b["call"] or a["data"] != json.loads(_dumps(b["data"]))
+        ),
+        None,
+    )
+    if mismatch is None and len(recorded) != len(replayed):
+        mismatch = min(len(recorded), len(replayed))
+    result = {
+        ATTR_ENTITY_ID: entity_id,
+        "recorded": len(recorded),
+        "replayed": len(replayed),
+        "first_mismatch": mismatch,
+        "duration": round(time.monotonic() - started, 3),
+    }
+    hass.bus.async_fire(EVENT_REPLAY_FINISHED, result)
+    _LOGGER.debug("Воспроизведение %s: %s", path, result)
+    return result
+
+
+# Записи трасс, которые идут сейчас
+_recorders: dict[str, TraceRecorder] = {}
+
+
+def trace_path(hass: HomeAssistant, entity_id: str, filename: str | None = None) -> str:
+    return hass.config.path(filename or f"{DOMAIN}_trace_{entity_id.replace('.', '_')}.jsonl")
+
+
+async def async_start_trace(hass: HomeAssistant, entity_id: str, filename: str | None = None) -> None:
+    await async_stop_trace(entity_id)
+    recorder = _recorders[entity_id] = TraceRecorder(hass, entity_id, trace_path(hass, entity_id, filename))
+    await recorder.async_start()
+    _LOGGER.debug("Запись трассы %s в %s", entity_id, recorder.path)
+
+
+async def async_stop_trace(entity_id: str) -> None:
+    if recorder := _recorders.pop(entity_id, None):
+        await recorder.async_stop()
+        _LOGGER.debug("Трасса %s записана в %s", entity_id, recorder.path)
@@ -9,21 +9,40 @@ from homeassistant.const import (
     CONF_NAME,
     STATE_IDLE,
     STATE_PAUSED,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
     EVENT_STATE_CHANGED,
     ATTR_ENTITY_ID,
 )
-from homeassistant.core import Context, Event, State
+from homeassistant.core import Context, Event, State, callback
 from homeassistant.helpers import entity_registry
-from homeassistant.helpers.script import Script
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.util import dt as dt_util
+from typing import TYPE_CHECKING
 import json
-import yaml
 import asyncio
+import logging
+import time
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.script import Script
 
 from .const import (
     DOMAIN,
     CONF_ZONES,
     CONF_ROOM_ID,
+    CONF_SIMULATOR,
+    CONF_DURATION,
+    CONF_SCHEDULE,
+    CONF_AREA_ID,
+    CONF_MAP_ID,
+    CONF_MIN_INTERVAL,
+    CONF_ROUTE,
+    CONF_WAIT_SEQUENCE,
+    CONF_OPTIMIZE_ROUTE,
+    CONF_ACTIVITY_ENTITY,
+    CONF_ACTIVITY_THRESHOLD,
     CONF_CLEAN_TIMES,
     CONF_FAN_LEVEL,
     CONF_WATER_LEVEL,
@@ -31,7 +50,32 @@ from .const import (
     CONF_MOP_MODE,
     CONF_ON,
     DELAY_BEFORE_CLEAN,
+    RATE_LIMIT_RATE,
+    RATE_LIMIT_BURST,
+    RECHARGE_BATTERY_LEVEL,
+    RECHARGED_BATTERY_LEVEL,
+    BATTERY_DRAIN,
+    DURATION_SMOOTHING,
+    RECHARGE_STATUS_ATTRS,
+    RECHARGE_STATUS_MARKERS,
+    WATCHDOG_RETRIES,
+    EVENT_WATCHDOG,
+    EVENT_MAP_REJECTED,
+    EVENT_ROOM_DONE,
+    CURRENT_ROOM_ATTRS,
+    SIGNAL_QUEUE_UPDATED,
 )
+from .backends import get_backend
+from .planner import ROOM_PARAMS, order_route, plan_runs, split_by_battery
+from .scheduler import Scheduler, parse_schedule
+from .areas import AreaIndex
+from .registry import get_zone_index, release_zone_index
+from .limiter import RateLimiter
+from .maps import MapRooms
+from .store import QueueStore
+from .watchdog import Watchdog
+
+_LOGGER = logging.getLogger(__name__)
 
 
 try:
@@ -41,108 +85,286 @@ try:
     STATE_CLEANING = VacuumActivity.CLEANING
     STATE_RETURNING = VacuumActivity.RETURNING
     STATE_DOCKED = VacuumActivity.DOCKED
+    STATE_ERROR = VacuumActivity.ERROR
 except ImportError:
     # if the new constants are unavailable, use the old ones
     from homeassistant.components.vacuum import (
         STATE_CLEANING,
         STATE_RETURNING,
         STATE_DOCKED,
+        STATE_ERROR,
     )
 
 # Глобальное хранилище для ожидающих запусков и таймеров
 _pending_vacuums = {}  # {entity_id: {timer_task: task, vacuums: [ZoneVacuum, ...]}}
+# Очереди на паузе и зоны, уборка которых была прервана паузой
+_paused_vacuums = {}  # {entity_id: [ZoneVacuum, ...]}
+# Зоны пакета, которые не поместились в заряд батареи и ждут подзарядки
+_deferred_vacuums = {}  # {entity_id: [ZoneVacuum, ...]}
+# Зоны пакета, прерванные срочной уборкой, - продолжим их после неё
+_preempted_vacuums = {}  # {entity_id: [ZoneVacuum, ...]}
+# Заряд батареи в начале захода: {entity_id: (time.monotonic(), battery_level)}
+_run_battery = {}
+# Текущие заходы планировщика и их параметры
+_runs = {}  # {entity_id: [ZoneVacuum, ...]}
+_run_params = {}  # {entity_id: (fan_level, water_level, clean_mode, mop_mode, clean_times)}
+# Сторожевые таймеры заходов
+_watchdogs = {}  # {entity_id: Watchdog}
+# Расписания зон
+_schedulers = {}  # {entity_id: Scheduler}
+# Ограничители облачных вызовов xiaomi_miot
+_limiters = {}  # {entity_id: RateLimiter}
+# Комнаты каждой карты родительских пылесосов
+_maps = {}  # {entity_id: MapRooms}
+# Виртуальные пылесосы каждого родительского пылесоса
+_zones = {}  # {entity_id: [ZoneVacuum, ...]}
+# Интеграции, которые изображает симулятор: {entity_id: platform}
+_simulated_platforms = {}
+# Комната, в которой сейчас убирает родительский пылесос
+_current_rooms = {}  # {entity_id: room_id}
+# Родительские пылесосы, уехавшие на подзарядку посреди уборки
+_recharging_vacuums: set[str] = set()
+# Маршруты патрулирования в работе
+_routes = {}  # {entity_id: {"vacuum": ZoneVacuum, "target": [x, y], "points": [[x, y], ...]}}
+# Индекс областей (общий для всех родительских пылесосов)
+_area_index: AreaIndex | None = None
+
+
+def get_area_index(hass) -> AreaIndex:
+    global _area_index
+    if _area_index is None:
+        _area_index = AreaIndex(hass)
+    return _area_index
+
+
+def release_area_index() -> None:
+    """Stop the area and zone indexes once the last zone is removed."""
+    global _area_index
+    if _area_index is not None and not len(_area_index):
+        _area_index.async_stop()
+        _area_index = None
+        release_zone_index()
+
+
+def is_recharging(state: State, unfinished: bool = False) -> bool:
+    """Check if the parent vacuum returns to recharge and will resume the job.
+
+    Низкий заряд сам по себе - только признак: задание могло и честно закончиться
+    на низком заряде, поэтому он учитывается, лишь если в заходе остались комнаты.
+    """
+    status = " ".join(
+        str(state.attributes.get(attr, "")) for attr in RECHARGE_STATUS_ATTRS
+    ).lower()
+    if any(marker in status for marker in RECHARGE_STATUS_MARKERS):
+        return True
+    battery = state.attributes.get("battery_level")
+    return unfinished and isinstance(battery, (int, float)) and battery < RECHARGE_BATTERY_LEVEL
+
+
+def run_unfinished(entity_id: str) -> bool:
+    """В текущем заходе есть комнаты, где пылесос ещё не был (по отчётам о текущей комнате)."""
+    if entity_id not in _current_rooms or (watchdog := _watchdogs.get(entity_id)) is None:
+        return False
+    return any(
+        vacuum._attr_state == STATE_CLEANING
+        and vacuum.visited_rooms is not None
+        and not vacuum.visited_rooms >= set(vacuum.room_ids)
+        for vacuum in watchdog.run
+    )
+
+
+def is_recharged(state: State) -> bool:
+    battery = state.attributes.get("battery_level")
+    return not isinstance(battery, (int, float)) or battery >= RECHARGED_BATTERY_LEVEL
+
+
+def battery_level(state: State | None) -> float | None:
+    battery = state.attributes.get("battery_level") if state else None
+    return float(battery) if isinstance(battery, (int, float)) else None
 
 
 async def async_setup_platform(hass, _, async_add_entities, discovery_info=None):
     """Set up platform from YAML configuration."""
+    if CONF_SIMULATOR in discovery_info:
+        # Симулятор нужен только для тестов, поэтому импортируем его по требованию
+        from .simulator import async_setup_simulator
+
+        await async_setup_simulator(hass, discovery_info[CONF_SIMULATOR], async_add_entities)
+
     entity_id: str = discovery_info["entity_id"]
+    await _async_setup_zones(hass, entity_id, discovery_info["zones"], async_add_entities)
+
+
+async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_entities):
+    """Set up platform from config entry."""
+    data = config_entry.data
+    entity_id: str = data[ATTR_ENTITY_ID]
+    
+    # Зоны уже хранятся в нативных типах (версия 2 записи)
+    zones_config = {
+        zone_id: dict(zone_data) for zone_id, zone_data in data[CONF_ZONES].items()
+    }
+
+    config_entry.async_on_unload(
+        await _async_setup_zones(hass, entity_id, zones_config, async_add_entities)
+    )
+
+
+async def _async_setup_zones(hass, entity_id: str, zones_config: dict, async_add_entities):
+    """Create virtual vacuums of one parent vacuum and follow its state.
+
+    Возвращает функцию, которая снимает слушатель, таймеры и задачи этого пылесоса.
+    """
     queue: list[ZoneVacuum] = []
+    store = QueueStore(hass, entity_id)
     entities = [
-        ZoneVacuum(name, config, entity_id, queue)
-        for name, config in discovery_info["zones"].items()
+        ZoneVacuum(name, config, entity_id, queue, store)
+        for name, config in zones_config.items()
     ]
-    async_add_entities(entities)
 
-    async def state_changed_event_listener(event: Event):
-        if entity_id != event.data.get(ATTR_ENTITY_ID):
-            return
+    def snapshot() -> dict:
+        # Отложенные до подзарядки зоны после перезапуска снова собираются в пакет
+        pending = (
+            _pending_vacuums.get(entity_id, {}).get("vacuums", [])
+            + _deferred_vacuums.get(entity_id, [])
+            + _preempted_vacuums.get(entity_id, [])
+        )
+        return {
+            "queue": [vacuum.unique_id for vacuum in queue],
+            "pending": [vacuum.unique_id for vacuum in pending],
+            "running": [
+                vacuum.unique_id for vacuum in entities
+                if vacuum._attr_state == STATE_CLEANING
+            ],
+            "durations": store.durations,
+            "last_cleaned": store.last_cleaned,
+            "activity": store.activity,
+            "battery_drain": store.battery_drain,
+            "paused": (
+                [vacuum.unique_id for vacuum in _paused_vacuums[entity_id]]
+                if entity_id in _paused_vacuums else None
+            ),
+        }
 
-        new_state: State = event.data.get("new_state")
-        
-        # Если родительский пылесос переходит в режим зарядки, сбрасываем статусы виртуальных пылесосов
-        if new_state.state in (STATE_RETURNING, STATE_DOCKED):
-            # Отменяем таймеры для ожидающих пылесосов
-            if entity_id in _pending_vacuums:
-                pending = _pending_vacuums.pop(entity_id)
-                if pending["timer_task"]:
-                    pending["timer_task"].cancel()
-                # Сбрасываем статусы ожидающих пылесосов
-                for vacuum in pending["vacuums"]:
-                    vacuum._attr_state = STATE_IDLE
+    async def async_restore():
+        """Сверяем сохранённую очередь с текущим состоянием родительского пылесоса."""
+        data, store.restored = store.restored, None
+        by_id = {vacuum.unique_id: vacuum for vacuum in entities}
+        running = [by_id[i] for i in data.get("running", []) if i in by_id]
+        pending = [by_id[i] for i in data.get("pending", []) if i in by_id]
+        queue[:] = [by_id[i] for i in data.get("queue", []) if i in by_id]
+
+        state = hass.states.get(entity_id)
+        if data.get("paused") is not None:
+            # Очередь была на паузе - оставляем её замороженной до продолжения
+            _paused_vacuums[entity_id] = [by_id[i] for i in data["paused"] if i in by_id]
+            for vacuum in queue + pending + _paused_vacuums[entity_id]:
+                vacuum._attr_state = STATE_PAUSED
+                vacuum.async_write_ha_state()
+            if pending:
+                _pending_vacuums[entity_id] = {"timer_task": None, "vacuums": pending}
+        elif state.state in (STATE_CLEANING, STATE_PAUSED, STATE_RETURNING):
+            # Пылесос ещё работает - продолжаем ждать окончания текущей уборки
+            for vacuum in running:
+                vacuum._attr_state = STATE_CLEANING
+                vacuum.async_write_ha_state()
+            if run := [vacuum for vacuum in queue if vacuum in running]:
+                _runs[entity_id] = run
+            if running:
+                arm_run(entity_id, running)
+            for vacuum in queue:
+                if vacuum not in running:
+                    vacuum._attr_state = STATE_PAUSED
                     vacuum.async_write_ha_state()
-                    print(f"[VacuumZones DEBUG] Отменили ожидание для {vacuum.name}")
-            
-            # Проверяем все виртуальные пылесосы
-            for entity in entities:
-                if entity._attr_state == STATE_CLEANING or entity._attr_state == STATE_PAUSED:
-                    entity._attr_state = STATE_IDLE
-                    entity.async_write_ha_state()
-                    print(f"[VacuumZones DEBUG] Сбросили статус для {entity.name}")
-        
-        if not queue:
+        else:
+            # Текущая уборка завершилась, пока HA был выключен - не повторяем её
+            queue[:] = [vacuum for vacuum in queue if vacuum not in running]
+            for vacuum in queue[1:]:
+                vacuum._attr_state = STATE_PAUSED
+                vacuum.async_write_ha_state()
+            if queue:
+                await async_start_next_run(queue, Context())
+
+        if entity_id not in _paused_vacuums:
+            for vacuum in pending:
+                await vacuum.async_start()
+
+        _LOGGER.debug("Восстановили очередь %s: %s", entity_id, data)
+        store.async_schedule_save()
+
+    async def async_ready():
+        if store.restored is None:
+            store.async_schedule_save()
             return
-            
-        if new_state.state not in (STATE_RETURNING, STATE_DOCKED):
+        state = hass.states.get(entity_id)
+        # Родительский пылесос ещё не загрузился - восстановим по первому событию
+        if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
             return
+        await async_restore()
 
-        prev: ZoneVacuum = queue.pop(0)
-        await prev.internal_stop()
+    async def async_stalled(run: list[ZoneVacuum], attempt: int):
+        """Заход не завершился за ожидаемое время - ждём дальше, повторяем или снимаем его.
 
-        if not queue:
+        Пока пылесос занят (убирает, едет на базу, недоступен), очередь не двигаем:
+        следующий заход прервал бы ещё идущую уборку.
+        """
+        state = hass.states.get(entity_id)
+        stopped = state is not None and state.state in (STATE_IDLE, STATE_DOCKED, STATE_ERROR)
+        retry = stopped and attempt < WATCHDOG_RETRIES
+        action = "retry" if retry else "expire" if stopped else "extend"
+        hass.bus.async_fire(
+            EVENT_WATCHDOG,
+            {
+                ATTR_ENTITY_ID: entity_id,
+                "zones": [vacuum.entity_id for vacuum in run],
+                "action": action,
+                "attempt": attempt,
+            },
+        )
+        _LOGGER.debug("Заход %s завис, %s", [v.name for v in run], action)
+
+        if not stopped:
+            watchdog.async_extend(run)
+            return
+
+        if retry:
+            # Пылесос так и не начал уборку - команда, видимо, потерялась
+            watchdog.next_attempt = attempt + 1
+            if queue and queue[0] in run:
+                await async_start_next_run(queue, Context())
+            else:
+                # Повтор добавляется к уже собираемому пакету, а не заменяет его
+                pending = _pending_vacuums.setdefault(entity_id, {"timer_task": None, "vacuums": []})
+                pending["vacuums"][:0] = [vacuum for vacuum in run if vacuum not in pending["vacuums"]]
+                run[0].schedule_pending_vacuums()
             return
 
-        next_: ZoneVacuum = queue[0]
-        await next_.internal_start(event.context)
+        _runs.pop(entity_id, None)
+        _routes.pop(entity_id, None)
+        _recharging_vacuums.discard(entity_id)
+        for vacuum in run:
+            if vacuum in queue:
+                queue.remove(vacuum)
+            await vacuum.internal_stop()
+        if queue and entity_id not in _paused_vacuums:
+            await async_start_next_run(queue, Context())
 
-    hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed_event_listener)
+    async def async_scheduled(due: list[ZoneVacuum]):
+        """По расписанию запускаем все зоны одного окна вместе."""
+        _LOGGER.debug("Запуск по расписанию: %s", [v.name for v in due])
+        await async_start_zones(
+            [vacuum for vacuum in due if vacuum._attr_state == STATE_IDLE], Context()
+        )
 
+    store.data_func = snapshot
+    store.on_ready = async_ready
+    await store.async_load([vacuum.unique_id for vacuum in entities])
+    watchdog = _watchdogs[entity_id] = Watchdog(hass, store.durations, async_stalled)
+    _schedulers[entity_id] = Scheduler(hass, async_scheduled)
+    _limiters[entity_id] = RateLimiter(hass, RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+    _maps[entity_id] = MapRooms()
+    _zones[entity_id] = entities
 
-async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_entities):
-    """Set up platform from config entry."""
-    data = config_entry.data
-    entity_id: str = data[ATTR_ENTITY_ID]
-    queue: list[ZoneVacuum] = []
-    
-    # Парсим конфигурацию зон
-    zones_config = {}
-    for zone_id, zone_data in data[CONF_ZONES].items():
-        config = dict(zone_data)
-        
-        # Парсим JSON строки если они есть
-        if isinstance(config.get("zone"), str):
-            try:
-                config["zone"] = json.loads(config["zone"])
-            except (json.JSONDecodeError, TypeError):
-                pass
-                
-        if isinstance(config.get("goto"), str):
-            try:
-                config["goto"] = json.loads(config["goto"])
-            except (json.JSONDecodeError, TypeError):
-                pass
-                
-        if isinstance(config.get(CONF_SEQUENCE), str):
-            try:
-                config[CONF_SEQUENCE] = yaml.safe_load(config[CONF_SEQUENCE])
-            except (yaml.YAMLError, TypeError):
-                pass
-        
-        zones_config[zone_id] = config
-    
-    entities = [
-        ZoneVacuum(name, config, entity_id, queue)
-        for name, config in zones_config.items()
-    ]
     async_add_entities(entities)
 
     async def state_changed_event_listener(event: Event):
@@ -150,9 +372,84 @@ async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_entities)
             return
 
         new_state: State = event.data.get("new_state")
+        if new_state is None:
+            return
+
+        _maps[entity_id].update(new_state)
+
+        if store.restored is not None:
+            if new_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+                await async_restore()
+            return
+
+        old_state: State | None = event.data.get("old_state")
+
+        # Очередь на паузе - не двигаем её, пока пользователь не продолжит уборку
+        if entity_id in _paused_vacuums:
+            if (
+                not _paused_vacuums[entity_id]
+                or new_state.state != STATE_CLEANING
+                or (old_state is not None and old_state.state == STATE_CLEANING)
+            ):
+                return
+            # Уборку продолжили с робота или из родительской сущности, а не из зоны
+            for vacuum in _paused_vacuums.pop(entity_id):
+                vacuum._attr_state = STATE_CLEANING
+                vacuum.async_write_ha_state()
+            watchdog.async_resume()
+            if pending := _pending_vacuums.get(entity_id):
+                pending["vacuums"][0].schedule_pending_vacuums()
+            _LOGGER.debug("%s продолжил уборку сам, снимаем паузу очереди", entity_id)
+
+        if entity_id in _routes and await async_route_step(entity_id, old_state, new_state):
+            return
+
+        if (
+            entity_id in _deferred_vacuums
+            and entity_id not in _recharging_vacuums
+            and new_state.state == STATE_DOCKED
+            and old_state is not None
+            and old_state.state == STATE_DOCKED
+        ):
+            # Пылесос заряжается на базе - отложенные зоны запустим, когда заряда хватит
+            await async_start_deferred(entity_id, new_state)
+            return
+
+        if new_state.state == STATE_CLEANING:
+            track_progress(entity_id, new_state)
+
+        if entity_id in _recharging_vacuums:
+            if new_state.state == STATE_CLEANING:
+                # Пылесос зарядился и продолжил ту же комнату
+                _recharging_vacuums.discard(entity_id)
+                watchdog.async_resume()
+                _LOGGER.debug("%s продолжил уборку после зарядки", entity_id)
+                return
+            if new_state.state != STATE_DOCKED or not is_recharged(new_state):
+                return
+            # Пылесос зарядился, но уборку не продолжил - считаем задание завершённым
+            _recharging_vacuums.discard(entity_id)
+        elif old_state is not None and old_state.state == new_state.state:
+            # Изменились только атрибуты - задание не завершилось
+            return
+        elif (
+            new_state.state in (STATE_RETURNING, STATE_DOCKED)
+            and is_recharging(new_state, run_unfinished(entity_id))
+            and (queue or any(entity._attr_state == STATE_CLEANING for entity in entities))
+        ):
+            # Возврат на подзарядку посреди уборки - задание остаётся в работе
+            _recharging_vacuums.add(entity_id)
+            # Зарядка может длиться часами - не считаем её зависанием
+            watchdog.async_cancel()
+            _LOGGER.debug("%s уехал на подзарядку, очередь сохранена", entity_id)
+            return
         
         # Если родительский пылесос переходит в режим зарядки, сбрасываем статусы виртуальных пылесосов
         if new_state.state in (STATE_RETURNING, STATE_DOCKED):
+            _routes.pop(entity_id, None)
+            learn_battery_drain(entity_id, store, new_state)
+            for vacuum in watchdog.async_finish():
+                vacuum.mark_cleaned()
             # Отменяем таймеры для ожидающих пылесосов
             if entity_id in _pending_vacuums:
                 pending = _pending_vacuums.pop(entity_id)
@@ -164,45 +461,105 @@ async def async_setup_entry(hass, config_entry: ConfigEntry, async_add_entities)
                     vacuum.async_write_ha_state()
                     print(f"[VacuumZones DEBUG] Отменили ожидание для {vacuum.name}")
             
-            # Проверяем все виртуальные пылесосы
+            # Проверяем все виртуальные пылесосы (кроме ждущих подзарядки или конца срочной уборки)
+            waiting = _deferred_vacuums.get(entity_id, []) + _preempted_vacuums.get(entity_id, [])
             for entity in entities:
+                if entity in waiting:
+                    continue
                 if entity._attr_state == STATE_CLEANING or entity._attr_state == STATE_PAUSED:
                     entity._attr_state = STATE_IDLE
                     entity.async_write_ha_state()
                     print(f"[VacuumZones DEBUG] Сбросили статус для {entity.name}")
-        
+
+            if new_state.state == STATE_DOCKED and entity_id in _deferred_vacuums:
+                await async_start_deferred(entity_id, new_state)
+
+            # Срочная уборка закончилась - продолжаем прерванный пакет с оставшихся комнат.
+            # Ждём базы: собранный при возврате пакет отменила бы стыковка (см. выше)
+            if new_state.state == STATE_DOCKED:
+                for vacuum in _preempted_vacuums.pop(entity_id, []):
+                    vacuum.add_to_pending()
+
         if not queue:
             return
             
         if new_state.state not in (STATE_RETURNING, STATE_DOCKED):
             return
 
-        prev: ZoneVacuum = queue.pop(0)
-        await prev.internal_stop()
+        # Завершился текущий заход: одна зона или группа зон планировщика
+        for prev in _runs.pop(entity_id, None) or queue[:1]:
+            if prev in queue:
+                queue.remove(prev)
+            await prev.internal_stop()
 
         if not queue:
             return
 
-        next_: ZoneVacuum = queue[0]
-        await next_.internal_start(event.context)
+        await async_start_next_run(queue, event.context)
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed_event_listener)
+
+    async def async_unload():
+        unsub()
+        if pending := _pending_vacuums.get(entity_id):
+            if pending["timer_task"]:
+                pending["timer_task"].cancel()
+                pending["timer_task"] = None
+            for task in pending.get("prepared", {}).values():
+                task.cancel()
+        _watchdogs.pop(entity_id).async_clear()
+        _schedulers.pop(entity_id).async_stop()
+        _limiters.pop(entity_id).async_cancel()
+
+        # Снимок читает очередь и ожидающие запуски - записываем его до очистки
+        await store.async_unload()
 
-    hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed_event_listener)
+        for data in (
+            _pending_vacuums, _deferred_vacuums, _preempted_vacuums, _paused_vacuums, _runs, _run_params,
+            _run_battery, _maps, _routes, _current_rooms, _zones,
+        ):
+            data.pop(entity_id, None)
+        _recharging_vacuums.discard(entity_id)
+        queue.clear()
+        async_dispatcher_send(hass, SIGNAL_QUEUE_UPDATED, entity_id)
+        _LOGGER.debug("Выгрузили зоны %s", entity_id)
+
+    return async_unload
 
 
 class ZoneVacuum(StateVacuumEntity):
     _attr_state = STATE_IDLE
-    _attr_supported_features = VacuumEntityFeature.START | VacuumEntityFeature.STOP
+    _attr_supported_features = (
+        VacuumEntityFeature.START | VacuumEntityFeature.STOP | VacuumEntityFeature.PAUSE
+    )
 
     domain: str = None
     service: str = None
-    script: Script = None
+    script: "Script" = None
+    wait_sequence: bool = True  # Команда уборки ждёт окончания скрипта
     room_clean_params: dict = None  # Параметры для уборки комнаты
     room_attrs_params: dict = None  # Параметры для сохранения настроек комнаты
+    room_params: dict = None  # Параметры захода для пылесосов без настроек по комнатам
+    room_id: int = None  # ID комнаты xiaomi_miot
+    zone_area_id: str = None  # Область Home Assistant из настроек зоны
+    map_id: str = None  # Карта, на которой находится зона
+    min_interval: float = None  # Минимальный интервал между уборками (в секундах)
+    activity_entity: str = None  # Счётчик присутствия/движения в зоне
+    activity_threshold: float = 1
+    route: list = None  # Точки маршрута патрулирования [[x, y], ...]
+    # Прогресс текущего захода
+    visited_rooms: set = None
+    cleaning_started = None
+    cleaning_finished = None
+    expected_duration: float = None  # Ожидаемая длительность уборки (в секундах)
 
-    def __init__(self, name: str, config: dict, entity_id: str, queue: list):
+    def __init__(
+        self, name: str, config: dict, entity_id: str, queue: list, store: QueueStore
+    ):
         self._attr_name = config.pop("name", name)
         self.service_data: dict = config | {ATTR_ENTITY_ID: entity_id}
         self.queue = queue
+        self.store = store
         # Добавляем уникальный идентификатор для возможности управления через UI
         zone_slug = name.lower().replace(" ", "_")
         self._attr_unique_id = f"{entity_id}_{zone_slug}"
@@ -219,6 +576,49 @@ class ZoneVacuum(StateVacuumEntity):
     def vacuum_entity_id(self) -> str:
         return self.service_data[ATTR_ENTITY_ID]
 
+    @property
+    def groupable(self) -> bool:
+        """Зону можно объединить с другими в один заход планировщика."""
+        return self.service == "vacuum_clean_segment" and self.script is None
+
+    @property
+    def batched(self) -> bool:
+        """Запуски зоны собираются DELAY_BEFORE_CLEAN секунд в общий пакет.
+
+        Комнаты xiaomi_miot уходят одной командой, зоны планировщика - одним заходом.
+        Сегменты со скриптом в заход не объединяются и идут в очередь по одной.
+        """
+        return bool(self.room_clean_params) or bool(self.room_params and self.groupable)
+
+    @property
+    def room_ids(self) -> list[int]:
+        """ID комнат, которые убирает зона."""
+        if self.room_clean_params:
+            return [self.room_id]
+        segments = self.service_data.get("segments") if self.service else None
+        if segments is None:
+            return []
+        try:
+            return [int(room) for room in (segments if isinstance(segments, list) else [segments])]
+        except (TypeError, ValueError):
+            return []
+
+    @property
+    def siblings(self) -> list["ZoneVacuum"]:
+        """Виртуальные пылесосы того же родительского пылесоса."""
+        return [
+            entity for entity in self.platform.entities.values()
+            if isinstance(entity, ZoneVacuum)
+            and entity.vacuum_entity_id == self.vacuum_entity_id
+        ]
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {
+            "cleaning_started": self.cleaning_started,
+            "cleaning_finished": self.cleaning_finished,
+        }
+
     @property
     def activity(self):  # HA 2026.1+
         """Return current activity using VacuumActivity enum when available.
@@ -242,14 +642,51 @@ class ZoneVacuum(StateVacuumEntity):
     async def async_added_to_hass(self):
         # init start script
         if sequence := self.service_data.pop(CONF_SEQUENCE, None):
+            # Помощник скриптов тяжёлый - импортируем только для зон с sequence
+            from homeassistant.helpers.script import Script
+
             self.script = Script(self.hass, sequence, self.name, VACUUM_DOMAIN)
+        self.wait_sequence = self.service_data.pop(CONF_WAIT_SEQUENCE, True)
+
+        if duration := self.service_data.pop(CONF_DURATION, None):
+            self.expected_duration = float(duration) * 60
+
+        self.zone_area_id = self.service_data.pop(CONF_AREA_ID, None)
+        self.map_id = self.service_data.pop(CONF_MAP_ID, None)
+        if min_interval := self.service_data.pop(CONF_MIN_INTERVAL, None):
+            self.min_interval = float(min_interval) * 60
+        self.activity_entity = self.service_data.pop(CONF_ACTIVITY_ENTITY, None)
+        self.activity_threshold = float(self.service_data.pop(CONF_ACTIVITY_THRESHOLD, 1))
+
+        if schedule := self.service_data.pop(CONF_SCHEDULE, None):
+            try:
+                _schedulers[self.vacuum_entity_id].async_add(self, parse_schedule(schedule))
+            except ValueError as e:
+                _LOGGER.warning("Ошибка расписания %s: %s", self.name, e)
 
         # get entity domain
         # https://github.com/home-assistant/core/blob/dev/homeassistant/components/xiaomi_miio/services.yaml
         # https://github.com/Tasshack/dreame-vacuum/blob/master/custom_components/dreame_vacuum/services.yaml
         # https://github.com/humbertogontijo/homeassistant-roborock/blob/main/custom_components/roborock/services.yaml
         entry = entity_registry.async_get(self.hass).async_get(self.vacuum_entity_id)
-        self.domain = entry.platform
+        self.domain = _simulated_platforms.get(self.vacuum_entity_id) or entry.platform
+
+        # Пылесосы без настроек по комнатам убирают комнату сегментом,
+        # а её параметры планировщик применяет ко всему заходу
+        if (
+            self.domain != "xiaomi_miot"
+            and self.service_data.get(CONF_ROOM_ID) not in (None, "")
+            and "room" not in self.service_data
+        ):
+            self.service_data["room"] = [self.service_data[CONF_ROOM_ID]]
+
+        # Маршрут патрулирования начинается как обычный goto в первую точку
+        optimize = self.service_data.pop(CONF_OPTIMIZE_ROUTE, False)
+        if route := self.service_data.pop(CONF_ROUTE, None):
+            self.route = [list(point[:2]) for point in route]
+            if optimize:
+                self.route = order_route(self.route)
+            self.service_data["goto"] = self.route[0]
 
         # migrate service field names
         if room := self.service_data.pop("room", None):
@@ -261,6 +698,13 @@ class ZoneVacuum(StateVacuumEntity):
         if "segments" in self.service_data:
             # "xiaomi_miio", "dreame_vacuum", "roborock"
             self.service = "vacuum_clean_segment"
+            self.room_params = {
+                param: int(self.service_data.pop(param))
+                for param in ROOM_PARAMS
+                if param in self.service_data
+            }
+            self.service_data.pop(CONF_ROOM_ID, None)
+            self.service_data.pop(CONF_ON, None)
         elif "zone" in self.service_data:
             # "xiaomi_miio", "dreame_vacuum", "roborock"
             if self.domain == "xiaomi_miio":
@@ -279,6 +723,7 @@ class ZoneVacuum(StateVacuumEntity):
                 room_id_int = int(room_id_val) if room_id_val not in (None, "") else 0
             except (TypeError, ValueError):
                 room_id_int = 0
+            self.room_id = room_id_int
 
             room_attrs_payload = {
                 "room_attrs": [
@@ -306,10 +751,9 @@ class ZoneVacuum(StateVacuumEntity):
             self.room_attrs_params = room_attrs_data
             
             self.service_data = room_attrs_data
-            # Вызываем сохранение параметров комнаты    
-            await self.hass.services.async_call(
-                            self.domain, self.service, self.service_data, True
-                        )
+            # Сохраняем параметры комнаты в фоне: при старте таких вызовов много,
+            # ограничитель растягивает их, чтобы облако не отбрасывало запросы
+            self.hass.async_create_task(self.async_push_room_attrs())
             # Параметры для уборки комнаты - сохраняем в room_clean_params
             room_for_clean = {
                 "room": [room_id_int]
@@ -325,30 +769,141 @@ class ZoneVacuum(StateVacuumEntity):
             }
             
             self.service_data = self.room_clean_params
-            
+
+        get_area_index(self.hass).async_add(self)
+        get_zone_index(self.hass).async_add(self.entity_id)
+        self.store.async_entity_added(self.unique_id)
+
+    async def async_will_remove_from_hass(self):
+        get_area_index(self.hass).async_remove(self)
+        release_area_index()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        super().async_write_ha_state()
+        # Любая смена статуса зоны меняет очередь - сохраняем её (с задержкой)
+        self.store.async_schedule_save()
+        async_dispatcher_send(self.hass, SIGNAL_QUEUE_UPDATED, self.vacuum_entity_id)
+
+    async def async_push_room_attrs(self) -> None:
+        """Save room settings on the device through the rate limiter."""
+        try:
+            await _limiters[self.vacuum_entity_id].async_call(
+                self.domain, "call_action", self.room_attrs_params, key=self.room_id
+            )
+        except Exception as e:
+            print(f"[VacuumZones DEBUG] Ошибка сохранения параметров для {self._attr_name}: {e}")
+
+    def start_sequence(self, context: Context) -> asyncio.Task | None:
+        """Start the zone script, return its task if the clean command has to wait for it."""
+        if not self.script:
+            return None
+        task = self.hass.async_create_task(self.script.async_run(context=context))
+        return task if self.wait_sequence else None
 
     async def internal_start(self, context: Context) -> None:
         self._attr_state = STATE_CLEANING
         self.async_write_ha_state()
 
-        if self.script:
-            await self.script.async_run(context=context)
+        # Подготовка идёт параллельно: скрипт зоны и параметры захода,
+        # команда уборки уходит, как только готово всё, чего она ждёт
+        steps = []
+        if task := self.start_sequence(context):
+            steps.append(task)
+        if self.room_params:
+            steps.append(self.async_apply_room_params(self.room_params))
+        await async_prepare(steps)
+
+        if self.route:
+            _routes[self.vacuum_entity_id] = {
+                "vacuum": self, "target": self.route[0], "points": self.route[1:],
+            }
   
         if self.service:
             try:
-                    await self.hass.services.async_call(
-                        self.domain, self.service, self.service_data, True
+                    await _limiters[self.vacuum_entity_id].async_call(
+                        self.domain, self.service, self.service_data, urgent=True
                     )
                     
             except Exception as e:
                 print(f"[VacuumZones DEBUG] Ошибка вызова {self.domain}.{self.service}: {e}")
 
+    def _activity_value(self) -> float | None:
+        if not self.activity_entity:
+            return None
+        state = self.hass.states.get(self.activity_entity)
+        try:
+            return float(state.state)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    @callback
+    def mark_cleaned(self) -> None:
+        """Запоминаем успешную уборку зоны для политики свежести."""
+        if self.cleaning_finished is None:
+            self.cleaning_finished = dt_util.utcnow().isoformat()
+        self.store.last_cleaned[self.unique_id] = time.time()
+        if (value := self._activity_value()) is not None:
+            self.store.activity[self.unique_id] = value
+
+    @property
+    def is_fresh(self) -> bool:
+        """Зона недавно убрана и с тех пор в ней почти не было активности."""
+        if not self.min_interval:
+            return False
+        last = self.store.last_cleaned.get(self.unique_id)
+        if last is None or time.time() - last >= self.min_interval:
+            return False
+        value = self._activity_value()
+        base = self.store.activity.get(self.unique_id)
+        if value is not None and base is not None:
+            # Счётчик сбросился или вырос достаточно - зону пора убрать
+            if value < base or value - base >= self.activity_threshold:
+                return False
+        return True
+
+    async def async_apply_room_params(self, params: dict) -> None:
+        """Apply run parameters to a vacuum without per-room settings."""
+        fan_level = params.get(CONF_FAN_LEVEL)
+        state = self.hass.states.get(self.vacuum_entity_id)
+        if fan_level is None or state is None:
+            return
+        # Уровни 1..4 соответствуют скоростям из fan_speed_list по порядку
+        speeds = state.attributes.get("fan_speed_list") or []
+        if 0 < fan_level <= len(speeds) and state.attributes.get("fan_speed") != speeds[fan_level - 1]:
+            await self.hass.services.async_call(
+                VACUUM_DOMAIN,
+                "set_fan_speed",
+                {ATTR_ENTITY_ID: self.vacuum_entity_id, "fan_speed": speeds[fan_level - 1]},
+                True,
+            )
+
+    async def async_goto(self, point: list) -> None:
+        """Send the parent vacuum to the next point of the route."""
+        try:
+            await _limiters[self.vacuum_entity_id].async_call(
+                self.domain,
+                "vacuum_goto",
+                {ATTR_ENTITY_ID: self.vacuum_entity_id, "x_coord": point[0], "y_coord": point[1]},
+                urgent=True,
+            )
+        except Exception as e:
+            _LOGGER.warning("Ошибка вызова %s.vacuum_goto: %s", self.domain, e)
+
     async def internal_stop(self):
         self._attr_state = STATE_IDLE
         self.async_write_ha_state()
 
     async def async_start(self):
-        if not self.room_clean_params:
+        entity_id = self.vacuum_entity_id
+
+        # Очередь на паузе - продолжаем её с текущей зоны
+        if entity_id in _paused_vacuums:
+            await self.async_resume()
+            if self._attr_state != STATE_IDLE:
+                return
+
+        if not self.batched:
             # Для зон без параметров комнаты (старый код)
             self.queue.append(self)
             print(f"[VacuumZones DEBUG] Запуск очереди {self.vacuum_entity_id}")
@@ -358,101 +913,600 @@ class ZoneVacuum(StateVacuumEntity):
                 print(f"[VacuumZones DEBUG] Ставим на паузу {self.vacuum_entity_id}")
                 self.async_write_ha_state()
                 return
-            await self.internal_start(self._context)
+            await async_start_next_run(self.queue, self._context)
             return
         
-        # Для зон с параметрами комнаты - ждем и собираем все запуски
+        self.add_to_pending()
+
+    def add_to_pending(self):
+        """Для зон с параметрами комнаты - ждем и собираем все запуски."""
         entity_id = self.vacuum_entity_id
-        
+        # Зоны с другой карты и недавно убранные снимаем до отправки настроек комнаты в облако
+        if not filter_fresh(filter_active_map([self])):
+            return
         # Добавляем текущий пылесос в список ожидающих
         if entity_id not in _pending_vacuums:
             _pending_vacuums[entity_id] = {"timer_task": None, "vacuums": []}
         
         _pending_vacuums[entity_id]["vacuums"].append(self)
+        if self.room_attrs_params:
+            # Настройки комнаты отправляем сразу, пока собираются остальные запуски
+            _pending_vacuums[entity_id].setdefault("prepared", {})[self] = self.hass.async_create_task(
+                self.async_push_room_attrs()
+            )
         self._attr_state = STATE_PAUSED
         self.async_write_ha_state()
         print(f"[VacuumZones DEBUG] Добавляем в очередь ожидающих {entity_id}, всего в очереди: {len(_pending_vacuums[entity_id]['vacuums'])}")
-        
-        # Если таймер уже установлен - не создаем новый
-        if _pending_vacuums[entity_id]["timer_task"] is not None:
+
+        self.schedule_pending_vacuums()
+
+    def schedule_pending_vacuums(self):
+        """Устанавливает таймер на DELAY_BEFORE_CLEAN секунд для сбора запусков."""
+        pending = _pending_vacuums[self.vacuum_entity_id]
+        # Если таймер уже установлен или очередь на паузе - не создаем новый
+        if pending["timer_task"] is not None or self.vacuum_entity_id in _paused_vacuums:
             return
-        
-        # Устанавливаем таймер на DELAY_BEFORE_CLEAN секунд
-        async def process_pending_vacuums():
-            await asyncio.sleep(DELAY_BEFORE_CLEAN)
-            
-            if entity_id not in _pending_vacuums:
-                return
-            
-            pending = _pending_vacuums.pop(entity_id)
-            vacuums = pending["vacuums"]
-            
-            if not vacuums:
-                return
-            
-            print(f"[VacuumZones DEBUG] Обрабатываем {len(vacuums)} пылесосов для {entity_id}")
-            
-            # Собираем все комнаты из массива комнат
-            all_rooms = []
-            for vacuum in vacuums:
-                # Парсим params из room_clean_params
-                params_str = vacuum.room_clean_params.get("params", [""])[0]
-                try:
-                    room_data = json.loads(params_str)
-                    room_ids = room_data.get("room", [])
-                    all_rooms.extend(room_ids)
-                except (json.JSONDecodeError, TypeError):
-                    print(f"[VacuumZones DEBUG] Ошибка парсинга params для {vacuum._attr_name}")
-            
-            if all_rooms:
-                # Объединяем все комнаты в один массив и убираем дубликаты
-                unique_rooms = list(set(all_rooms))
-                
-                # Вызываем сохранение параметров для каждой комнаты
-                for vacuum in vacuums:
-                    try:
-                        if vacuum.room_attrs_params:
-                            await vacuum.hass.services.async_call(
-                                vacuum.domain, "call_action",
-                                vacuum.room_attrs_params,
-                                True
-                            )
-                    except Exception as e:
-                        print(f"[VacuumZones DEBUG] Ошибка сохранения параметров для {vacuum._attr_name}: {e}")
-                
-                # Вызываем уборку один раз для всех комнат
-                room_for_clean_all = {
-                    "room": unique_rooms
-                }
-                room_for_clean_all_str = json.dumps(room_for_clean_all, ensure_ascii=False)
-                
-                try:
-                    first_vacuum = vacuums[0]
-                    await first_vacuum.hass.services.async_call(
-                        first_vacuum.domain, "call_action",
-                        {
-                            ATTR_ENTITY_ID: entity_id,
-                            "siid": 2,
-                            "aiid": 13,
-                            "params": [room_for_clean_all_str],
-                        },
-                        True
-                    )
-                    print(f"[VacuumZones DEBUG] Запустили уборку комнат {unique_rooms}")
-                except Exception as e:
-                    print(f"[VacuumZones DEBUG] Ошибка запуска уборки: {e}")
-                
-                # Устанавливаем состояние CLEANING для всех виртуальных пылесосов
-                for vacuum in vacuums:
-                    vacuum._attr_state = STATE_CLEANING
-                    vacuum.async_write_ha_state()
-        
-        _pending_vacuums[entity_id]["timer_task"] = self.hass.async_create_task(process_pending_vacuums())
+        pending["timer_task"] = self.hass.async_create_task(
+            process_pending_vacuums(self.vacuum_entity_id)
+        )
+
+    async def async_pause(self):
+        """Pause the parent vacuum and freeze the queue."""
+        entity_id = self.vacuum_entity_id
+        if entity_id in _paused_vacuums:
+            return
+
+        # Зоны, которые убираются сейчас - их продолжим после паузы
+        running = [vacuum for vacuum in self.siblings if vacuum._attr_state == STATE_CLEANING]
+        _paused_vacuums[entity_id] = running
+        if watchdog := _watchdogs.get(entity_id):
+            watchdog.async_cancel()
+
+        # Останавливаем таймер сбора запусков, сами запуски сохраняем
+        if pending := _pending_vacuums.get(entity_id):
+            if pending["timer_task"]:
+                pending["timer_task"].cancel()
+                pending["timer_task"] = None
+
+        state = self.hass.states.get(entity_id)
+        if state and state.state in (STATE_CLEANING, STATE_RETURNING):
+            await self.hass.services.async_call(
+                VACUUM_DOMAIN, "pause", {ATTR_ENTITY_ID: entity_id}, True
+            )
+
+        for vacuum in running:
+            vacuum._attr_state = STATE_PAUSED
+            vacuum.async_write_ha_state()
+        _LOGGER.debug("Пауза очереди %s: %s", entity_id, [v.name for v in running])
+
+    async def async_resume(self):
+        """Resume the parent vacuum from the current zone."""
+        entity_id = self.vacuum_entity_id
+        running = _paused_vacuums.pop(entity_id, None)
+        if running is None:
+            return
+
+        if running and (route := _routes.get(entity_id)):
+            # Маршрут продолжаем с точки, к которой пылесос ехал до паузы
+            await route["vacuum"].async_goto(route["target"])
+        elif running:
+            # Пылесос продолжает прерванную уборку, настройки комнат не отправляем повторно
+            await self.hass.services.async_call(
+                VACUUM_DOMAIN, "start", {ATTR_ENTITY_ID: entity_id}, True
+            )
+            for vacuum in running:
+                vacuum._attr_state = STATE_CLEANING
+                vacuum.async_write_ha_state()
+            if watchdog := _watchdogs.get(entity_id):
+                watchdog.async_resume()
+        elif self.queue and self.queue[0]._attr_state == STATE_PAUSED:
+            # Пауза случилась до запуска первой зоны
+            await async_start_next_run(self.queue, self._context)
+
+        if pending := _pending_vacuums.get(entity_id):
+            pending["vacuums"][0].schedule_pending_vacuums()
+        _LOGGER.debug("Продолжаем очередь %s", entity_id)
 
     async def async_stop(self, **kwargs):
+        _paused_vacuums.pop(self.vacuum_entity_id, None)
+        _runs.pop(self.vacuum_entity_id, None)
+        _routes.pop(self.vacuum_entity_id, None)
+        for vacuum in _deferred_vacuums.pop(self.vacuum_entity_id, []):
+            await vacuum.internal_stop()
+        for vacuum in _preempted_vacuums.pop(self.vacuum_entity_id, []):
+            await vacuum.internal_stop()
+        if watchdog := _watchdogs.get(self.vacuum_entity_id):
+            watchdog.async_clear()
+        _recharging_vacuums.discard(self.vacuum_entity_id)
+
         for vacuum in self.queue:
             await vacuum.internal_stop()
 
         self.queue.clear()
 
         await self.internal_stop()
+
+
+async def process_pending_vacuums(entity_id: str):
+    """Запускает одну общую уборку для всех собранных за DELAY_BEFORE_CLEAN зон."""
+    await asyncio.sleep(DELAY_BEFORE_CLEAN)
+    
+    if entity_id not in _pending_vacuums:
+        return
+    
+    pending = _pending_vacuums.pop(entity_id)
+    vacuums = filter_fresh(filter_active_map(pending["vacuums"]))
+    
+    if not vacuums:
+        return
+
+    # Зоны пылесосов без настроек по комнатам встают в очередь заходами планировщика
+    if planned := [vacuum for vacuum in vacuums if vacuum.groupable]:
+        queue = planned[0].queue
+        idle = not queue
+        queue.extend(vacuum for vacuum in planned if vacuum not in queue)
+        if idle:
+            await async_start_next_run(queue, planned[0]._context)
+        vacuums = [vacuum for vacuum in vacuums if not vacuum.groupable]
+        if not vacuums:
+            return
+    
+    # Пакет, который не укладывается в заряд батареи, делим на части по целым комнатам
+    vacuums, deferred = split_batch_by_battery(entity_id, vacuums)
+    if deferred:
+        _deferred_vacuums.setdefault(entity_id, []).extend(deferred)
+        _LOGGER.debug("После подзарядки: %s", [v.name for v in deferred])
+
+    await async_clean_rooms(entity_id, vacuums, pending.get("prepared", {}))
+
+
+async def async_clean_rooms(entity_id: str, vacuums: list[ZoneVacuum], prepared: dict) -> None:
+    """Save room settings and start one xiaomi_miot clean command for all rooms of the batch."""
+    print(f"[VacuumZones DEBUG] Обрабатываем {len(vacuums)} пылесосов для {entity_id}")
+    
+    # Собираем все комнаты из массива комнат
+    all_rooms = []
+    for vacuum in vacuums:
+        # Парсим params из room_clean_params
+        params_str = vacuum.room_clean_params.get("params", [""])[0]
+        try:
+            room_data = json.loads(params_str)
+            room_ids = room_data.get("room", [])
+            all_rooms.extend(room_ids)
+        except (json.JSONDecodeError, TypeError):
+            print(f"[VacuumZones DEBUG] Ошибка парсинга params для {vacuum._attr_name}")
+    
+    if all_rooms:
+        # Объединяем все комнаты в один массив и убираем дубликаты
+        unique_rooms = list(set(all_rooms))
+        
+        # Настройки комнат (обычно уже отправлены при сборе запусков) и скрипты зон
+        # выполняются параллельно, команда уборки ждёт только их
+        steps = [
+            prepared.get(vacuum) or vacuum.async_push_room_attrs()
+            for vacuum in vacuums
+            if vacuum.room_attrs_params
+        ]
+        steps += [task for vacuum in vacuums if (task := vacuum.start_sequence(vacuum._context))]
+        await async_prepare(steps)
+        
+        # Вызываем уборку один раз для всех комнат
+        room_for_clean_all = {
+            "room": unique_rooms
+        }
+        room_for_clean_all_str = json.dumps(room_for_clean_all, ensure_ascii=False)
+        
+        try:
+            first_vacuum = vacuums[0]
+            # Команда уборки идёт вне очереди ограничителя
+            await _limiters[entity_id].async_call(
+                first_vacuum.domain, "call_action",
+                {
+                    ATTR_ENTITY_ID: entity_id,
+                    "siid": 2,
+                    "aiid": 13,
+                    "params": [room_for_clean_all_str],
+                },
+                urgent=True,
+            )
+            print(f"[VacuumZones DEBUG] Запустили уборку комнат {unique_rooms}")
+        except Exception as e:
+            print(f"[VacuumZones DEBUG] Ошибка запуска уборки: {e}")
+        
+        # Устанавливаем состояние CLEANING для всех виртуальных пылесосов
+        for vacuum in vacuums:
+            vacuum._attr_state = STATE_CLEANING
+            vacuum.async_write_ha_state()
+        arm_run(entity_id, vacuums)
+
+
+async def async_prepare(steps: list) -> None:
+    """Wait for all pre-start steps, a failed step doesn't block the clean command."""
+    if not steps:
+        return
+    for result in await asyncio.gather(*steps, return_exceptions=True):
+        if isinstance(result, Exception):
+            _LOGGER.warning("Ошибка подготовки к уборке: %s", result)
+
+
+def filter_active_map(vacuums: list[ZoneVacuum]) -> list[ZoneVacuum]:
+    """Keep zones of the active map, reject the others before any cloud call."""
+    if not vacuums:
+        return vacuums
+
+    hass = vacuums[0].hass
+    entity_id = vacuums[0].vacuum_entity_id
+    if (maps := _maps.get(entity_id)) is None:
+        return vacuums
+    maps.update(hass.states.get(entity_id))
+
+    accepted, rejected = [], []
+    for vacuum in vacuums:
+        (accepted if maps.accepts(vacuum.map_id, vacuum.room_ids) else rejected).append(vacuum)
+
+    if rejected:
+        hass.bus.async_fire(
+            EVENT_MAP_REJECTED,
+            {
+                ATTR_ENTITY_ID: entity_id,
+                "zones": [vacuum.entity_id for vacuum in rejected],
+                "active_map": maps.active,
+            },
+        )
+        _LOGGER.debug("Зоны не на текущей карте %s: %s", maps.active, [v.name for v in rejected])
+        for vacuum in rejected:
+            if vacuum in vacuum.queue:
+                vacuum.queue.remove(vacuum)
+            vacuum._attr_state = STATE_IDLE
+            vacuum.async_write_ha_state()
+
+    return accepted
+
+
+def filter_fresh(vacuums: list[ZoneVacuum]) -> list[ZoneVacuum]:
+    """Drop zones that were cleaned recently, see min_interval."""
+    accepted = []
+    for vacuum in vacuums:
+        if not vacuum.is_fresh:
+            accepted.append(vacuum)
+            continue
+        _LOGGER.debug("Пропускаем недавно убранную зону %s", vacuum.name)
+        if vacuum in vacuum.queue:
+            vacuum.queue.remove(vacuum)
+        vacuum._attr_state = STATE_IDLE
+        vacuum.async_write_ha_state()
+    return accepted
+
+
+def arm_run(entity_id: str, run: list[ZoneVacuum]) -> None:
+    """Начало захода: сторожевой таймер и прогресс по комнатам."""
+    _current_rooms.pop(entity_id, None)
+    if run and (level := battery_level(run[0].hass.states.get(entity_id))) is not None:
+        _run_battery[entity_id] = (time.monotonic(), level)
+    for vacuum in run:
+        vacuum.visited_rooms = set()
+        vacuum.cleaning_started = vacuum.cleaning_finished = None
+    if watchdog := _watchdogs.get(entity_id):
+        watchdog.async_arm(run)
+
+
+def queue_view(entity_id: str) -> dict | None:
+    """Queue, pending batch, current run and per-room progress of one parent vacuum."""
+    if (zones := _zones.get(entity_id)) is None:
+        return None
+    watchdog = _watchdogs.get(entity_id)
+    return {
+        "queue": [vacuum.entity_id for vacuum in zones[0].queue] if zones else [],
+        "pending": [vacuum.entity_id for vacuum in _pending_vacuums.get(entity_id, {}).get("vacuums", [])],
+        "deferred": [vacuum.entity_id for vacuum in _deferred_vacuums.get(entity_id, [])],
+        "preempted": [vacuum.entity_id for vacuum in _preempted_vacuums.get(entity_id, [])],
+        "run": [vacuum.entity_id for vacuum in watchdog.run] if watchdog else [],
+        "paused": entity_id in _paused_vacuums,
+        "recharging": entity_id in _recharging_vacuums,
+        "zones": {
+            vacuum.entity_id: {
+                "state": str(getattr(vacuum._attr_state, "value", vacuum._attr_state)),
+                "visited_rooms": sorted(vacuum.visited_rooms or []),
+                "cleaning_started": vacuum.cleaning_started,
+                "cleaning_finished": vacuum.cleaning_finished,
+            }
+            for vacuum in zones
+            if vacuum.entity_id
+        },
+    }
+
+
+def queue_views() -> dict:
+    return {entity_id: queue_view(entity_id) for entity_id in _zones}
+
+
+def battery_cost(vacuum: ZoneVacuum) -> float:
+    """Ожидаемый расход батареи на зону (%), 0 - если длительность зоны неизвестна."""
+    watchdog = _watchdogs.get(vacuum.vacuum_entity_id)
+    if watchdog is None or (
+        vacuum.unique_id not in vacuum.store.durations and not vacuum.expected_duration
+    ):
+        return 0
+    return watchdog.expected_duration(vacuum) * (vacuum.store.battery_drain or BATTERY_DRAIN)
+
+
+def split_batch_by_battery(entity_id: str, vacuums: list[ZoneVacuum]) -> tuple[list, list]:
+    """Split the batch so that the first part fits the current charge."""
+    if not vacuums:
+        return vacuums, []
+    level = battery_level(vacuums[0].hass.states.get(entity_id))
+    if level is None:
+        return vacuums, []
+    return split_by_battery(
+        vacuums, [battery_cost(vacuum) for vacuum in vacuums], level - RECHARGE_BATTERY_LEVEL
+    )
+
+
+def learn_battery_drain(entity_id: str, store: QueueStore, state: State) -> None:
+    """Заход завершился - уточняем расход батареи для следующих пакетов."""
+    if (started := _run_battery.pop(entity_id, None)) is None:
+        return
+    level = battery_level(state)
+    elapsed = time.monotonic() - started[0]
+    if level is None or level >= started[1] or elapsed < 60:
+        return
+    drain = (started[1] - level) / elapsed
+    old = store.battery_drain
+    store.battery_drain = drain if old is None else old + (drain - old) * DURATION_SMOOTHING
+
+
+async def async_start_deferred(entity_id: str, state: State) -> None:
+    """Start zones left for after a top-up once the charge is enough for the next part."""
+    vacuums = _deferred_vacuums[entity_id]
+    level = battery_level(state)
+    if (
+        level is not None
+        and level < RECHARGED_BATTERY_LEVEL
+        and level - RECHARGE_BATTERY_LEVEL < battery_cost(vacuums[0])
+    ):
+        return
+    del _deferred_vacuums[entity_id]
+    _LOGGER.debug("Заряд %s%%, запускаем отложенные зоны %s", level, [v.name for v in vacuums])
+    for vacuum in vacuums:
+        vacuum.add_to_pending()
+
+
+def current_room(state: State) -> int | None:
+    for attr in CURRENT_ROOM_ATTRS:
+        try:
+            return int(state.attributes[attr])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def track_progress(entity_id: str, state: State) -> None:
+    """Зона готова, как только пылесос побывал во всех её комнатах и уехал в другую."""
+    room = current_room(state)
+    if room is None or room == _current_rooms.get(entity_id):
+        return
+    _current_rooms[entity_id] = room
+
+    if (watchdog := _watchdogs.get(entity_id)) is None:
+        return
+    now = dt_util.utcnow().isoformat()
+    for vacuum in watchdog.run:
+        if vacuum._attr_state != STATE_CLEANING or vacuum.visited_rooms is None:
+            continue
+        room_ids = vacuum.room_ids
+        if room in room_ids:
+            vacuum.visited_rooms.add(room)
+            if vacuum.cleaning_started is None:
+                vacuum.cleaning_started = now
+                vacuum.async_write_ha_state()
+        elif vacuum.visited_rooms and vacuum.visited_rooms >= set(room_ids):
+            vacuum._attr_state = STATE_IDLE
+            vacuum.mark_cleaned()
+            vacuum.async_write_ha_state()
+            vacuum.hass.bus.async_fire(
+                EVENT_ROOM_DONE, {ATTR_ENTITY_ID: vacuum.entity_id, "room_ids": room_ids}
+            )
+            _LOGGER.debug("Зона %s убрана", vacuum.name)
+    # Посещённые комнаты меняются без смены статуса зон - сообщаем подписчикам сами
+    async_dispatcher_send(watchdog.hass, SIGNAL_QUEUE_UPDATED, entity_id)
+
+
+async def async_route_step(entity_id: str, old_state: State | None, new_state: State) -> bool:
+    """Пылесос доехал до точки маршрута - сразу отправляем его в следующую.
+
+    После последней точки пылесос возвращается на базу, и заход завершается как обычно.
+    """
+    if (
+        new_state.state != STATE_IDLE
+        or old_state is None
+        or old_state.state in (STATE_IDLE, STATE_UNAVAILABLE, STATE_UNKNOWN)
+    ):
+        return False
+
+    route = _routes[entity_id]
+    vacuum: ZoneVacuum = route["vacuum"]
+    if route["points"]:
+        route["target"] = route["points"].pop(0)
+        _LOGGER.debug("%s: следующая точка маршрута %s", vacuum.name, route["target"])
+        await vacuum.async_goto(route["target"])
+        return True
+
+    _routes.pop(entity_id)
+    _LOGGER.debug("%s: маршрут пройден, возвращаемся на базу", vacuum.name)
+    try:
+        await vacuum.hass.services.async_call(
+            VACUUM_DOMAIN, "return_to_base", {ATTR_ENTITY_ID: entity_id}, True
+        )
+    except Exception as e:
+        _LOGGER.warning("Ошибка возврата на базу: %s", e)
+    return True
+
+
+async def async_start_next_run(queue: list[ZoneVacuum], context: Context) -> None:
+    """Запускает следующий заход очереди: одну зону или группу зон с одинаковыми параметрами."""
+    # Зоны с другой карты и недавно убранные снимаем с очереди до любых вызовов пылесоса
+    filter_fresh(filter_active_map(list(queue)))
+    if not queue:
+        return
+
+    head = queue[0]
+    if not head.groupable:
+        arm_run(head.vacuum_entity_id, [head])
+        await head.internal_start(context)
+        return
+
+    entity_id = head.vacuum_entity_id
+    backend = get_backend(head.domain)
+    candidates = [vacuum for vacuum in queue if vacuum.groupable]
+    # Заходы делят только параметры, которые пылесос применяет ко всему заходу
+    key, run = plan_runs(candidates, _run_params.get(entity_id), backend.run_wide)[0]
+
+    # Заход встаёт в начало очереди, остальные зоны ждут своей группы
+    queue[:] = run + [vacuum for vacuum in queue if vacuum not in run]
+    await async_start_run(entity_id, run, key)
+
+
+async def async_start_run(entity_id: str, run: list[ZoneVacuum], key: tuple) -> None:
+    """Start one run of segment zones with a single command."""
+    head = run[0]
+    backend = get_backend(head.domain)
+    _runs[entity_id] = run
+    _run_params[entity_id] = key
+    arm_run(entity_id, run)
+
+    for vacuum in run:
+        vacuum._attr_state = STATE_CLEANING
+        vacuum.async_write_ha_state()
+
+    # Сегменты и их настройки уходят одной командой
+    service_data = backend.segment_call(entity_id, run)
+
+    _LOGGER.debug("Заход %s с параметрами %s", [v.name for v in run], key)
+    try:
+        if CONF_FAN_LEVEL in backend.run_wide:
+            await head.async_apply_room_params(run[0].room_params)
+        await head.hass.services.async_call(
+            head.domain, "vacuum_clean_segment", service_data, True
+        )
+    except Exception as e:
+        _LOGGER.warning("Ошибка запуска захода: %s", e)
+
+
+async def async_start_zones(vacuums: list[ZoneVacuum], context: Context) -> None:
+    """Start several zones together, so the device gets as few commands as possible."""
+    if not vacuums:
+        return
+
+    entity_id = vacuums[0].vacuum_entity_id
+    queue = vacuums[0].queue
+    idle = not queue and entity_id not in _paused_vacuums
+    for vacuum in vacuums:
+        if vacuum.batched:
+            # Попадут в одну общую команду после сбора запусков
+            vacuum.add_to_pending()
+            continue
+        queue.append(vacuum)
+        vacuum._attr_state = STATE_PAUSED
+        vacuum.async_write_ha_state()
+
+    if idle and queue:
+        await async_start_next_run(queue, context)
+
+
+async def async_clean_areas(hass, area_ids: list[str], context: Context) -> None:
+    """Start all zones of the areas, one batched run per parent vacuum."""
+    index = get_area_index(hass)
+    by_parent: dict[str, list[ZoneVacuum]] = {}
+    for area_id in area_ids:
+        for vacuum in index.async_get(area_id):
+            vacuums = by_parent.setdefault(vacuum.vacuum_entity_id, [])
+            if vacuum._attr_state == STATE_IDLE and vacuum not in vacuums:
+                vacuums.append(vacuum)
+
+    _LOGGER.debug("Уборка областей %s: %s", area_ids, [v.name for z in by_parent.values() for v in z])
+    for vacuums in by_parent.values():
+        await async_start_zones(vacuums, context)
+
+
+async def async_clean_now(hass, entity_ids: list[str], context: Context) -> None:
+    """Start the zones right away, interrupting the current job of their parent vacuums."""
+    by_parent: dict[str, list[ZoneVacuum]] = {}
+    for zones in _zones.values():
+        for vacuum in zones:
+            if vacuum.entity_id in entity_ids:
+                by_parent.setdefault(vacuum.vacuum_entity_id, []).append(vacuum)
+
+    for entity_id, urgent in by_parent.items():
+        await async_preempt(entity_id, urgent, context)
+
+
+async def async_preempt(entity_id: str, urgent: list[ZoneVacuum], context: Context) -> None:
+    """Прерываем текущее задание, убираем срочные зоны и продолжаем задание с оставшихся комнат.
+
+    Зоны очереди остаются в ней за срочными зонами, зоны пакета xiaomi_miot ждут
+    в _preempted_vacuums и собираются в новый пакет, когда срочная уборка закончится.
+    Уже убранные зоны прерванного захода (см. track_progress) не повторяются.
+    """
+    hass = urgent[0].hass
+    queue = urgent[0].queue
+    watchdog = _watchdogs[entity_id]
+
+    running = [vacuum for vacuum in watchdog.run if vacuum._attr_state == STATE_CLEANING]
+    paused = _paused_vacuums.pop(entity_id, None) or []
+    if not running and not paused:
+        # Прерывать нечего - обычный запуск
+        await async_start_zones([vacuum for vacuum in urgent if vacuum._attr_state == STATE_IDLE], context)
+        return
+
+    _LOGGER.debug("Срочная уборка %s прерывает %s", [v.name for v in urgent], [v.name for v in running + paused])
+    watchdog.async_clear()
+    _runs.pop(entity_id, None)
+    _routes.pop(entity_id, None)
+    _recharging_vacuums.discard(entity_id)
+
+    preempted = _preempted_vacuums.setdefault(entity_id, [])
+    # Собранные, но ещё не отправленные запуски тоже ждут конца срочной уборки
+    if pending := _pending_vacuums.pop(entity_id, None):
+        if pending["timer_task"]:
+            pending["timer_task"].cancel()
+        preempted.extend(vacuum for vacuum in pending["vacuums"] if vacuum not in urgent)
+
+    # Убранные зоны прерванного захода больше не ждут в очереди
+    queue[:] = [vacuum for vacuum in queue if vacuum not in urgent and vacuum._attr_state != STATE_IDLE]
+    for vacuum in running + paused:
+        if vacuum in urgent:
+            continue
+        vacuum._attr_state = STATE_PAUSED
+        vacuum.async_write_ha_state()
+        if vacuum not in queue and vacuum not in preempted:
+            preempted.append(vacuum)
+    if not preempted:
+        del _preempted_vacuums[entity_id]
+
+    try:
+        await hass.services.async_call(VACUUM_DOMAIN, "stop", {ATTR_ENTITY_ID: entity_id}, True)
+    except Exception as e:
+        _LOGGER.warning("Ошибка остановки %s: %s", entity_id, e)
+
+    rooms = [vacuum for vacuum in urgent if vacuum.room_clean_params]
+    others = [vacuum for vacuum in urgent if not vacuum.room_clean_params]
+    # Срочные зоны очереди идут первыми, прерванные - сразу за ними
+    queue[:0] = others
+    for vacuum in others:
+        vacuum._attr_state = STATE_PAUSED
+        vacuum.async_write_ha_state()
+
+    if rooms:
+        # Заход не из очереди - по его окончании голова очереди не снимается
+        _runs[entity_id] = rooms
+        await async_clean_rooms(entity_id, rooms, {})
+    elif others[0].groupable:
+        backend = get_backend(others[0].domain)
+        key, run = plan_runs(
+            [vacuum for vacuum in others if vacuum.groupable], _run_params.get(entity_id), backend.run_wide
+        )[0]
+        queue[:] = run + [vacuum for vacuum in queue if vacuum not in run]
+        await async_start_run(entity_id, run, key)
+    else:
+        arm_run(entity_id, [others[0]])
+        await others[0].internal_start(context)
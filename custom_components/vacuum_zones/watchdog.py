@@ -0,0 +1,115 @@
+"""Watchdog for stuck runs of Vacuum Zones."""
+
+import time
+from typing import Callable, Coroutine
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DEFAULT_ZONE_DURATION, DURATION_SMOOTHING, WATCHDOG_FACTOR
+
+
+class Watchdog:
+    """Следит, чтобы заход не висел вечно, если пылесос так и не вернулся на базу.
+
+    Таймаут захода - сумма ожидаемых длительностей его зон (по истории уборок
+    или из настроек зоны), умноженная на WATCHDOG_FACTOR.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        durations: dict[str, float],
+        on_stalled: Callable[[list, int], Coroutine],
+    ):
+        self.hass = hass
+        # Сглаженная длительность уборки каждой зоны (в секундах), хранится вместе с очередью
+        self.durations = durations
+        self.on_stalled = on_stalled
+        self.run: list = []
+        self.attempt = 0
+        # Номер попытки для следующего захода (при повторе после таймаута)
+        self.next_attempt = 0
+        # Время активной уборки захода: паузы и подзарядка в длительность зон не входят
+        self._active = 0.0
+        self._started: float | None = None
+        self._cancel: Callable | None = None
+
+    def expected_duration(self, vacuum) -> float:
+        if vacuum.unique_id in self.durations:
+            return self.durations[vacuum.unique_id]
+        return vacuum.expected_duration or DEFAULT_ZONE_DURATION
+
+    @callback
+    def async_arm(self, run: list) -> None:
+        """Start watching a new run."""
+        self.run = list(run)
+        self.attempt, self.next_attempt = self.next_attempt, 0
+        self._active = 0.0
+        self._started = time.monotonic()
+        self._schedule()
+
+    @callback
+    def async_resume(self) -> None:
+        """Continue watching the same run after pause or recharge."""
+        if self.run:
+            if self._started is None:
+                self._started = time.monotonic()
+            self._schedule()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Stop the timer and the active time clock (pause or recharge)."""
+        self._cancel_timer()
+        if self._started is not None:
+            self._active += time.monotonic() - self._started
+            self._started = None
+
+    def _cancel_timer(self) -> None:
+        if self._cancel:
+            self._cancel()
+            self._cancel = None
+
+    @callback
+    def async_finish(self) -> list:
+        """Заход завершился - запоминаем длительность зон для следующих таймаутов.
+
+        Возвращает зоны завершённого захода.
+        """
+        self.async_cancel()
+        run = self.run
+        if self.run and self._active:
+            share = self._active / len(self.run)
+            for vacuum in self.run:
+                old = self.durations.get(vacuum.unique_id)
+                self.durations[vacuum.unique_id] = (
+                    share if old is None else old + (share - old) * DURATION_SMOOTHING
+                )
+        self.run = []
+        self._active = 0.0
+        return run
+
+    @callback
+    def async_extend(self, run: list) -> None:
+        """Пылесос ещё занят - следим за тем же заходом ещё один таймаут."""
+        self.run = list(run)
+        self._started = time.monotonic()
+        self._schedule()
+
+    @callback
+    def async_clear(self) -> None:
+        self.async_cancel()
+        self.run = []
+        self._active = 0.0
+
+    def _schedule(self) -> None:
+        self._cancel_timer()
+        timeout = sum(self.expected_duration(vacuum) for vacuum in self.run) * WATCHDOG_FACTOR
+        self._cancel = async_call_later(self.hass, timeout, self._async_fired)
+
+    async def _async_fired(self, _now) -> None:
+        self._cancel = None
+        # Активное время сохраняем: если заход продлят, оно войдёт в длительность зон
+        self.async_cancel()
+        run, self.run = self.run, []
+        await self.on_stalled(run, self.attempt)
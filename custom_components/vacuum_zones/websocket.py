@@ -0,0 +1,79 @@
+"""WebSocket subscription to the queue state of Vacuum Zones."""
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import SIGNAL_QUEUE_UPDATED, WS_SUBSCRIBE
+
+
+@callback
+def async_register(hass: HomeAssistant) -> None:
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+def diff_view(old: dict | None, new: dict | None) -> dict | None:
+    """Только изменившиеся поля очереди, для зон - только изменившиеся зоны."""
+    if old is None or new is None:
+        return new
+    delta = {key: value for key, value in new.items() if key != "zones" and old.get(key) != value}
+    old_zones = old.get("zones", {})
+    zones = {
+        zone_id: zone
+        for zone_id, zone in new.get("zones", {}).items()
+        if old_zones.get(zone_id) != zone
+    }
+    zones.update({zone_id: None for zone_id in old_zones if zone_id not in new.get("zones", {})})
+    if zones:
+        delta["zones"] = zones
+    return delta
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_SUBSCRIBE})
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict) -> None:
+    """Снимок очередей всех родительских пылесосов, затем только изменения.
+
+    Изменения за один проход цикла событий собираются и отправляются одним сообщением.
+    """
+    from .vacuum import queue_view, queue_views
+
+    sent = queue_views()
+    dirty: set[str] = set()
+    scheduled = False
+
+    @callback
+    def async_send_delta() -> None:
+        nonlocal scheduled
+        scheduled = False
+        vacuums = {}
+        for entity_id in dirty:
+            view = queue_view(entity_id)
+            if (delta := diff_view(sent.get(entity_id), view)) != {}:
+                vacuums[entity_id] = delta
+            if view is None:
+                sent.pop(entity_id, None)
+            else:
+                sent[entity_id] = view
+        dirty.clear()
+        if vacuums:
+            connection.send_message(
+                websocket_api.event_message(msg["id"], {"type": "delta", "vacuums": vacuums})
+            )
+
+    @callback
+    def async_queue_updated(entity_id: str) -> None:
+        nonlocal scheduled
+        dirty.add(entity_id)
+        if not scheduled:
+            scheduled = True
+            hass.loop.call_soon(async_send_delta)
+
+    connection.subscriptions[msg["id"]] = async_dispatcher_connect(
+        hass, SIGNAL_QUEUE_UPDATED, async_queue_updated
+    )
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(msg["id"], {"type": "snapshot", "vacuums": sent})
+    )
@@ -0,0 +1 @@
+"""Tests for the Vacuum Zones integration."""
@@ -0,0 +1,68 @@
+"""Fixtures for Vacuum Zones tests.
+
+Тесты идут на тестовом экземпляре HA из pytest-homeassistant-custom-component:
+    pip install -r requirements_test.txt
+"""
+
+import pytest
+
+try:
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+except ImportError as e:
+    # Без тестового экземпляра HA прогон должен упасть, а не пройти пустым
+    raise ImportError(
+        "Tests need pytest-homeassistant-custom-component: pip install -r requirements_test.txt"
+    ) from e
+
+from homeassistant.const import CONF_ENTITY_ID
+from homeassistant.helpers import entity_registry
+
+from custom_components.vacuum_zones.const import (
+    CONF_CLEAN_TIMES,
+    CONF_FAN_LEVEL,
+    CONF_ROOM_ID,
+    CONF_SCHEDULE,
+    CONF_ZONES,
+    DOMAIN,
+)
+
+PARENT = "vacuum.parent"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+def parent(hass):
+    """Родительский пылесос roborock: запись в реестре и состояние на базе."""
+    entity_registry.async_get(hass).async_get_or_create(
+        "vacuum", "roborock", "parent", suggested_object_id="parent"
+    )
+    hass.states.async_set(PARENT, "docked", {"battery_level": 100})
+    return PARENT
+
+
+@pytest.fixture
+def config_entry(hass, parent):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=2,
+        title=parent,
+        data={
+            CONF_ENTITY_ID: parent,
+            CONF_ZONES: {
+                "kitchen": {
+                    "name": "Kitchen",
+                    CONF_ROOM_ID: 16,
+                    CONF_CLEAN_TIMES: 1,
+                    CONF_FAN_LEVEL: 2,
+                    CONF_SCHEDULE: ["08:00"],
+                },
+                "hall": {"name": "Hall", CONF_ROOM_ID: 17, CONF_CLEAN_TIMES: 2, CONF_FAN_LEVEL: 3},
+            },
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
@@ -0,0 +1,88 @@
+"""An urgent clean interrupts the current batch, the batch resumes once the vacuum docks."""
+
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, callback
+from homeassistant.helpers import entity_registry
+from homeassistant.setup import async_setup_component
+
+from custom_components.vacuum_zones import vacuum
+from custom_components.vacuum_zones.const import (
+    CONF_CLEAN_TIMES,
+    CONF_ROOM_ID,
+    CONF_SIMULATOR,
+    CONF_ZONES,
+    DOMAIN,
+    SERVICE_CLEAN_NOW,
+)
+
+SIMULATOR = "vacuum.vacuum_zones_simulator"
+ROOMS = {16: "Kitchen", 17: "Hall", 18: "Bath"}
+
+
+async def _wait_for(predicate, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+async def test_preempted_batch_resumes_after_docking(hass):
+    config = {
+        DOMAIN: {
+            "entity_id": SIMULATOR,
+            CONF_ZONES: {
+                name: {CONF_ROOM_ID: room, CONF_CLEAN_TIMES: 1} for room, name in ROOMS.items()
+            },
+            CONF_SIMULATOR: {
+                "platform": "xiaomi_miot",
+                "latency": 0,
+                "latency_jitter": 0,
+                "room_duration": 0.2,
+                "return_duration": 0.2,
+                "rooms": ROOMS,
+            },
+        }
+    }
+    # Комнаты, которые убирал симулятор, по порядку
+    cleaned = []
+
+    @callback
+    def record(event: Event) -> None:
+        new_state = event.data["new_state"]
+        room = new_state.attributes.get("current_room") if new_state else None
+        if event.data["entity_id"] == SIMULATOR and room is not None and cleaned[-1:] != [room]:
+            cleaned.append(room)
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, record)
+    registry = entity_registry.async_get(hass)
+
+    def zone(name: str) -> str:
+        return registry.async_get_entity_id("vacuum", DOMAIN, f"{SIMULATOR}_{name.lower()}")
+
+    with patch.object(vacuum, "DELAY_BEFORE_CLEAN", 0):
+        assert await async_setup_component(hass, DOMAIN, config)
+        await hass.async_block_till_done()
+
+        for name in ("Kitchen", "Hall"):
+            await hass.services.async_call("vacuum", "start", {"entity_id": zone(name)}, blocking=True)
+        await _wait_for(lambda: cleaned == [16])
+
+        await hass.services.async_call(
+            DOMAIN, SERVICE_CLEAN_NOW, {"entity_id": zone("Bath")}, blocking=True
+        )
+        # Пакет ждёт конца срочной уборки и при возврате на базу не теряется
+        await _wait_for(lambda: hass.states.get(SIMULATOR).state == "returning")
+        assert len(vacuum._preempted_vacuums[SIMULATOR]) == 2
+        assert hass.states.get(zone("Hall")).state == "paused"
+
+        await _wait_for(lambda: 17 in cleaned[cleaned.index(18):])
+        await hass.async_block_till_done()
+
+    assert cleaned[:2] == [16, 18]
+    assert set(cleaned[2:]) == {16, 17}
+    assert hass.states.get(SIMULATOR).state == "docked"
+    assert SIMULATOR not in vacuum._preempted_vacuums
+    assert SIMULATOR not in vacuum._pending_vacuums
+    assert all(hass.states.get(zone(name)).state == "idle" for name in ROOMS.values())
@@ -0,0 +1,107 @@
+"""Reload and unload of a config entry must not leak listeners, tasks or memory."""
+
+import asyncio
+import gc
+import tracemalloc
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.helpers.area_registry import EVENT_AREA_REGISTRY_UPDATED
+from homeassistant.helpers.device_registry import EVENT_DEVICE_REGISTRY_UPDATED
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+
+from custom_components.vacuum_zones import registry, vacuum
+
+CYCLES = 300
+# Допустимый рост памяти, выделенной кодом интеграции, за все циклы
+MEMORY_BUDGET = 64 * 1024
+
+MODULE_STATE = (
+    vacuum._pending_vacuums,
+    vacuum._deferred_vacuums,
+    vacuum._preempted_vacuums,
+    vacuum._paused_vacuums,
+    vacuum._runs,
+    vacuum._run_params,
+    vacuum._run_battery,
+    vacuum._watchdogs,
+    vacuum._schedulers,
+    vacuum._limiters,
+    vacuum._maps,
+    vacuum._zones,
+    vacuum._routes,
+    vacuum._current_rooms,
+)
+# События, которые слушает интеграция; остальные слушатели принадлежат ядру HA
+EVENTS = (
+    EVENT_STATE_CHANGED,
+    EVENT_AREA_REGISTRY_UPDATED,
+    EVENT_DEVICE_REGISTRY_UPDATED,
+    EVENT_ENTITY_REGISTRY_UPDATED,
+)
+
+
+def _listeners(hass) -> dict[str, int]:
+    listeners = hass.bus.async_listeners()
+    return {event: listeners.get(event, 0) for event in EVENTS}
+
+
+async def _reload(hass, entry) -> None:
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+def _integration_memory() -> int:
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, f"*{vacuum.DOMAIN}*")]
+    )
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+async def test_reload_cycles_stay_flat(hass, config_entry, parent):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert len(hass.states.async_entity_ids("vacuum")) == 3
+
+    # Первый перезапуск прогревает кэши HA, дальше всё должно оставаться на месте
+    await _reload(hass, config_entry)
+    listeners = _listeners(hass)
+    tasks = len(asyncio.all_tasks())
+
+    tracemalloc.start()
+    try:
+        memory = _integration_memory()
+        for _ in range(CYCLES):
+            await _reload(hass, config_entry)
+        grown = _integration_memory() - memory
+    finally:
+        tracemalloc.stop()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert _listeners(hass) == listeners
+    assert len(asyncio.all_tasks()) == tasks
+    assert grown < MEMORY_BUDGET
+    assert len(vacuum._zones[parent]) == 2
+
+
+async def test_unload_releases_everything(hass, config_entry, parent):
+    listeners = None
+    # Первая загрузка ещё и настраивает сам компонент, поэтому слушатели сравниваем со второй
+    for _ in range(2):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert vacuum._area_index is not None
+        assert registry._zone_index is not None
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert config_entry.state is ConfigEntryState.NOT_LOADED
+        assert all(parent not in state for state in MODULE_STATE)
+        assert parent not in vacuum._recharging_vacuums
+        assert vacuum._area_index is None
+        assert registry._zone_index is None
+        if listeners is not None:
+            assert _listeners(hass) == listeners
+        listeners = _listeners(hass)
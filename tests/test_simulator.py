@@ -0,0 +1,64 @@
+"""The simulator drives zones through the services of the emulated integration."""
+
+from unittest.mock import patch
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, callback
+from homeassistant.helpers import entity_registry
+from homeassistant.setup import async_setup_component
+
+from custom_components.vacuum_zones import vacuum
+from custom_components.vacuum_zones.const import (
+    CONF_CLEAN_TIMES,
+    CONF_ROOM_ID,
+    CONF_SIMULATOR,
+    CONF_ZONES,
+    DOMAIN,
+)
+
+SIMULATOR = "vacuum.vacuum_zones_simulator"
+
+
+async def test_xiaomi_miot_rooms_go_through_call_action(hass):
+    config = {
+        DOMAIN: {
+            "entity_id": SIMULATOR,
+            CONF_ZONES: {"Kitchen": {CONF_ROOM_ID: 16, CONF_CLEAN_TIMES: 2}},
+            CONF_SIMULATOR: {
+                "platform": "xiaomi_miot",
+                "latency": 0,
+                "latency_jitter": 0,
+                "room_duration": 0,
+                "return_duration": 0,
+                "rooms": {16: "Kitchen"},
+            },
+        }
+    }
+    states = []
+
+    @callback
+    def record(event: Event) -> None:
+        if event.data["entity_id"] == SIMULATOR:
+            states.append(event.data["new_state"].state)
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, record)
+
+    with patch.object(vacuum, "DELAY_BEFORE_CLEAN", 0):
+        assert await async_setup_component(hass, DOMAIN, config)
+        await hass.async_block_till_done()
+        # Комната xiaomi_miot не превращается в сегмент
+        assert not hass.services.has_service("xiaomi_miot", "vacuum_clean_segment")
+        zone = entity_registry.async_get(hass).async_get_entity_id(
+            "vacuum", DOMAIN, f"{SIMULATOR}_kitchen"
+        )
+
+        await hass.services.async_call("vacuum", "start", {"entity_id": zone}, blocking=True)
+        await hass.async_block_till_done()
+
+    simulator = hass.states.get(SIMULATOR)
+    # Сохранение настроек комнаты (aiid 10) и запуск уборки (aiid 13)
+    assert simulator.attributes["commands"] >= 2
+    assert simulator.attributes["failed_commands"] == 0
+    assert "cleaning" in states
+    assert simulator.state == "docked"
+    assert hass.states.get(zone).state != "cleaning"
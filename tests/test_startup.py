@@ -0,0 +1,21 @@
+"""Import and setup of a config entry must fit into the startup budget."""
+
+import logging
+import time
+
+import custom_components.vacuum_zones as vacuum_zones
+from custom_components.vacuum_zones.const import STARTUP_BUDGET
+
+
+async def test_startup_within_budget(hass, config_entry, caplog):
+    started = time.perf_counter()
+    with caplog.at_level(logging.DEBUG, logger=vacuum_zones.__name__):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+    setup_time = time.perf_counter() - started
+
+    assert vacuum_zones.IMPORT_TIME + setup_time < STARTUP_BUDGET
+    records = [record for record in caplog.records if record.name == vacuum_zones.__name__]
+    # Профиль пишется в debug, предупреждение - только при превышении бюджета
+    assert any(record.levelno == logging.DEBUG for record in records)
+    assert not any(record.levelno >= logging.WARNING for record in records)
@@ -0,0 +1,53 @@
+"""A recorded trace replays offline with the same service calls."""
+
+import json
+from unittest.mock import patch
+
+from homeassistant.helpers import entity_registry
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+from custom_components.vacuum_zones import trace, vacuum
+from custom_components.vacuum_zones.const import DOMAIN
+
+
+async def _setup(hass, config_entry) -> None:
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_replay_matches_recording(hass, config_entry, parent, tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    kitchen = entity_registry.async_get(hass).async_get_entity_id(
+        "vacuum", DOMAIN, f"{parent}_kitchen"
+    )
+
+    with patch.object(vacuum, "DELAY_BEFORE_CLEAN", 0):
+        # Запись: сегменты уходят в заглушку вместо интеграции roborock
+        clean_segment = async_mock_service(hass, "roborock", "vacuum_clean_segment")
+        await _setup(hass, config_entry)
+        await trace.async_start_trace(hass, parent, path)
+        await hass.services.async_call("vacuum", "start", {"entity_id": kitchen}, blocking=True)
+        hass.states.async_set(parent, "cleaning", {"battery_level": 90})
+        await hass.async_block_till_done()
+        hass.states.async_set(parent, "docked", {"battery_level": 80})
+        await hass.async_block_till_done()
+        await trace.async_stop_trace(parent)
+        assert clean_segment
+
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert {"input": "vacuum.start", "data": {"entity_id": kitchen}} in [
+            {key: line[key] for key in ("input", "data")} for line in lines if "input" in line
+        ]
+        assert any(line.get("call") == "roborock.vacuum_clean_segment" for line in lines)
+
+        # Воспроизведение на чистой записи: заглушки ставит сама трасса
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        hass.services.async_remove("roborock", "vacuum_clean_segment")
+        hass.states.async_set(parent, "docked", {"battery_level": 100})
+        await _setup(hass, config_entry)
+        result = await trace.async_replay(hass, path, speed=100)
+
+    assert result["recorded"] == result["replayed"] > 0
+    assert result["first_mismatch"] is None
+    assert not hass.services.has_service("roborock", "vacuum_clean_segment")